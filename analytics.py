@@ -0,0 +1,170 @@
+# analytics.py
+"""
+Статистика оценок по курсам и студентам (GET /api/stats/...).
+
+Оценка хранится ещё и числом (records.grade_value: 2..5, NULL — «Не оценено»).
+Таблица grade_aggregates держит готовые суммы по месяцам для каждого курса
+и каждого студента; обработчики записи обновляют её в той же транзакции
+(track), так что запрос статистики читает только строки месяцев окна —
+его стоимость не зависит от числа записей. rebuild пересчитывает таблицу
+целиком одним INSERT ... SELECT (после ручных правок в БД), untrack_where
+вычитает записи по условию тем же GROUP BY — без загрузки строк в Python.
+
+Запуск: python analytics.py rebuild
+"""
+import sys
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import update, insert, delete, select, union_all, func, case, literal, cast, type_coerce, Date
+from models import Record, GradeAggregate
+
+GRADE_VALUES = {"5": 5, "4": 4, "3": 3, "2": 2}
+GRADES = (2, 3, 4, 5)
+SCOPES = {"course": Record.course_id, "student": Record.id_student}
+# колонки записи, от которых зависит статистика
+RECORD_STAT_COLUMNS = (Record.id_student, Record.course_id, Record.date, Record.grade_value)
+COUNTERS = ("total", "grade_2", "grade_3", "grade_4", "grade_5", "ungraded", "grade_sum")
+
+
+def grade_value(grade):
+    """Числовая оценка для строки grade; None — «Не оценено» и прочие значения"""
+    return GRADE_VALUES.get(grade.strip()) if isinstance(grade, str) else None
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def stat_row(rec):
+    """(id_student, course_id, date, grade_value) ORM-записи — до или после изменения"""
+    return rec.id_student, rec.course_id, rec.date, rec.grade_value
+
+
+def _counters(value, sign):
+    return (sign, *(sign if value == g else 0 for g in GRADES), sign if value is None else 0, sign * (value or 0))
+
+
+def track(db, added=(), removed=()):
+    """
+    Учесть добавленные и удалённые записи (кортежи RECORD_STAT_COLUMNS).
+    Изменение записи — удаление старого вида и добавление нового. Без commit.
+    """
+    deltas = defaultdict(lambda: [0] * len(COUNTERS))
+    for rows, sign in ((added, 1), (removed, -1)):
+        for id_student, course_id, day, value in rows:
+            counters = _counters(value, sign)
+            for key in (("course", course_id, month_start(day)), ("student", id_student, month_start(day))):
+                deltas[key] = [a + b for a, b in zip(deltas[key], counters)]
+    rows = [dict(zip(COUNTERS, counters), scope=scope, scope_id=scope_id, month=month)
+            for (scope, scope_id, month), counters in deltas.items() if any(counters)]
+    if rows:
+        _upsert(db, rows)
+
+
+def _upsert(db, rows):
+    """Прибавить счётчики к строкам grade_aggregates (создавая недостающие) одним executemany"""
+    table = GradeAggregate.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    else:
+        for row in rows:
+            key = (table.c.scope == row["scope"]) & (table.c.scope_id == row["scope_id"]) & (table.c.month == row["month"])
+            changes = {name: table.c[name] + row[name] for name in COUNTERS}
+            if db.execute(update(table).where(key).values(changes)).rowcount == 0:
+                db.execute(insert(table).values(row))
+        return
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.scope, table.c.scope_id, table.c.month],
+                                      set_={name: table.c[name] + stmt.excluded[name] for name in COUNTERS})
+    db.execute(stmt, rows)
+
+
+def _month_expr(dialect):
+    if dialect == "postgresql":
+        return cast(func.date_trunc("month", Record.date), Date)
+    return type_coerce(func.date(Record.date, "start of month"), Date)
+
+
+def _scope_totals(scope, dialect):
+    """SELECT счётчиков записей по (scope_id, month) — строки grade_aggregates одного scope"""
+    column = SCOPES[scope]
+    month = _month_expr(dialect).label("month")
+    value = Record.grade_value
+    counts = [func.count()] + [func.sum(case((value == g, 1), else_=0)) for g in GRADES]
+    counts += [func.sum(case((value.is_(None), 1), else_=0)), func.coalesce(func.sum(value), 0)]
+    return select(literal(scope).label("scope"), column.label("scope_id"), month,
+                  *(c.label(name) for c, name in zip(counts, COUNTERS))).group_by(column, month)
+
+
+def rebuild(conn):
+    """Пересчитать grade_aggregates из records (conn — соединение в транзакции)"""
+    table = GradeAggregate.__table__
+    conn.execute(delete(table))
+    for scope in SCOPES:
+        conn.execute(insert(table).from_select(["scope", "scope_id", "month", *COUNTERS],
+                                               _scope_totals(scope, conn.dialect.name)))
+
+
+def untrack_where(db, *conditions):
+    """
+    Вычесть из grade_aggregates записи, подходящие под conditions (до их
+    удаления): один GROUP BY по (scope, scope_id, month) и один upsert —
+    память и число параметров зависят от числа месяцев, а не записей. Без commit.
+    """
+    dialect = db.get_bind().dialect.name
+    totals = union_all(*(_scope_totals(scope, dialect).where(*conditions) for scope in SCOPES))
+    rows = [dict(row, **{name: -row[name] for name in COUNTERS}) for row in db.execute(totals).mappings()]
+    if rows:
+        _upsert(db, rows)
+
+
+def parse_month(value):
+    """'2024-03' -> date(2024, 3, 1); ValueError при неверном формате"""
+    year, month = value.split("-")
+    return date(int(year), int(month), 1)
+
+
+def summarize(rows):
+    """Сводка по строкам grade_aggregates: количество, среднее, распределение"""
+    sums = dict.fromkeys(COUNTERS, 0)
+    for row in rows:
+        for name in COUNTERS:
+            sums[name] += getattr(row, name)
+    graded = sums["total"] - sums["ungraded"]
+    return {
+        "count": sums["total"],
+        "graded": graded,
+        "ungraded": sums["ungraded"],
+        "average": round(sums["grade_sum"] / graded, 2) if graded else None,
+        "distribution": {str(g): sums[f"grade_{g}"] for g in GRADES},
+    }
+
+
+def grade_stats(db, scope, scope_id, start=None, end=None):
+    """Статистика курса или студента за месяцы [start, end] (включительно) и по каждому месяцу"""
+    query = db.query(GradeAggregate).filter(GradeAggregate.scope == scope, GradeAggregate.scope_id == scope_id,
+                                            GradeAggregate.total > 0)
+    if start:
+        query = query.filter(GradeAggregate.month >= start)
+    if end:
+        query = query.filter(GradeAggregate.month <= end)
+    rows = query.order_by(GradeAggregate.month).all()
+    by_month = [dict(month=row.month.strftime("%Y-%m"), **summarize([row])) for row in rows]
+    return dict(summarize(rows), by_month=by_month)
+
+
+def main(argv):
+    from models import engine
+    if argv[1:] != ["rebuild"]:
+        print(__doc__)
+        return 1
+    with engine.begin() as conn:
+        rebuild(conn)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
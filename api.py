@@ -1,33 +1,55 @@
 # api.py
-import io
+import json
+import base64
+import tempfile
+import zipfile
 import textwrap
-from flask import Blueprint, request, jsonify, send_file, current_app
-from sqlalchemy import asc, desc, or_
-from datetime import datetime
+import functools
+from flask import Blueprint, Response, request, jsonify, send_file, current_app, stream_with_context, make_response, g
+from sqlalchemy import asc, desc, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query
+from datetime import datetime, date
 from io import BytesIO
-from openpyxl import Workbook
-from docx import Document
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.utils import ImageReader
-from models import SessionLocal,engine,Student, Course, Record
+from config import REPLICA_STICKY_SECONDS
+from replicas import reading
+from models import SessionLocal,engine,Student, Course, Record, RECORD_ROW_COLUMNS, record_row_to_dict, parse_date
+from jobs import get_queue, get_render_pool, ordered_map, QueueFull, REPORT_KINDS, STATUS_DONE
+from archive import stream_zip, safe_filename
+from search import search_filter, ranked_search, index_upsert, index_remove, index_reset
+from versions import get_versions, bump_versions, make_etag
+from compression import compress_response, ENCODING_SUFFIXES
+from query_cache import get_cache, cache_key, invalidate as invalidate_cache
+from bulk import (BulkError, validate_create, validate_update, validate_delete,
+                  insert_records, update_records, delete_records, delete_where, DELETE_BATCH_SIZE)
+from importer import ImportFileError, detect_format, import_rows
+from metrics import timed, count_leaked_session
+from analytics import track, untrack_where, stat_row, grade_stats, parse_month
+from changes import stamp, tombstone, tombstone_where, collect_changes, CHANGE_SOURCES, DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT
 import os
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-import pandas as pd
-from openpyxl.utils import get_column_letter
-from sqlalchemy.orm import joinedload
-from reportlab.platypus import Paragraph
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.enums import TA_JUSTIFY
 
 # --- Blueprints ---
 api = Blueprint('api', __name__, url_prefix='/api')
 documents_bp = Blueprint("documents", __name__, url_prefix="/documents")
 excel_bp = Blueprint('excel_bp', __name__, url_prefix='/excel')
 pdf_bp = Blueprint("pdf", __name__, url_prefix="/pdf")
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+api.after_request(compress_response)
+
+
+@api.teardown_app_request
+def remove_session(exc=None):
+    """
+    Конец любого запроса приложения: сессия потока закрывается и соединение
+    возвращается в пул, даже если обработчик вышел по ошибке, не закрыв её.
+    Такие случаи считаются утечками (db_sessions_leaked_total) и пишутся в лог.
+    """
+    if SessionLocal.registry.has() and SessionLocal().in_transaction():
+        count_leaked_session(request.endpoint, exc is not None)
+        current_app.logger.warning("DB session left open by %s %s%s", request.method, request.path,
+                                   f" ({type(exc).__name__})" if exc is not None else "")
+    SessionLocal.remove()
 
 
 # --- Вспомогательная функция сортировки ---
@@ -39,41 +61,421 @@ def parse_sort_order(param):
     return None
 
 
-# ===============================
-# === STUDENTS (Студенты) ======
-# ===============================
-@api.route('/students', methods=['GET'])
-def list_students():
-    """Получить список студентов с фильтрацией и сортировкой"""
-    q = request.args.get('q', '').strip()
-    sort = request.args.get('sort', 'default')
+# --- Постраничный вывод (keyset / cursor) ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PageError(ValueError):
+    """Неверные параметры limit/cursor"""
+
+
+def encode_cursor(sort, values):
+    """Упаковать последний ключ страницы в непрозрачную строку"""
+    raw = json.dumps({"s": sort, "k": values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Распаковать курсор; сортировка должна совпадать с той, для которой он выдан"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = data['k']
+    except Exception:
+        raise PageError("Invalid cursor")
+    if data.get('s') != sort or not isinstance(values, list):
+        raise PageError("Invalid cursor")
+    return values
+
+
+def parse_page_args(args):
+    """Вернуть (limit, cursor) или None, если клиент не просил постраничный вывод"""
+    limit = args.get('limit', '').strip()
+    cursor = args.get('cursor', '').strip()
+    if not limit and not cursor:
+        return None
+    if limit:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PageError("Invalid limit")
+        if limit <= 0:
+            raise PageError("Invalid limit")
+    else:
+        limit = DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE), cursor or None
+
+
+def _cursor_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def paginate(query, id_col, key_col, sort, limit, cursor):
+    """
+    Keyset-пагинация: сортировка по (key_col, id) или только по id,
+    продолжение страницы через WHERE (key, id) > (:key, :id) вместо OFFSET,
+    поэтому стоимость запроса не зависит от глубины листания.
+    Возвращает (строки страницы, next_cursor).
+    """
+    direction = desc if sort == 'desc' else asc
+    keyed = key_col is not None and sort in ('asc', 'desc')
+    cols = (key_col, id_col) if keyed else (id_col,)
+
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        if len(values) != len(cols):
+            raise PageError("Invalid cursor")
+        if keyed and key_col.type.python_type is date:
+            try:
+                values[0] = date.fromisoformat(values[0])
+            except (TypeError, ValueError):
+                raise PageError("Invalid cursor")
+        if keyed:
+            last = tuple_(*cols)
+            bound = tuple_(*values)
+        else:
+            last, bound = id_col, values[0]
+        query = query.filter(last < bound if sort == 'desc' else last > bound)
+
+    rows = query.order_by(*[direction(c) for c in cols]).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        tail = rows[-1]
+        next_cursor = encode_cursor(sort, [_cursor_value(getattr(tail, c.key)) for c in cols])
+    return rows, next_cursor
+
+
+# --- Потоковая выдача (NDJSON) ---
+STREAM_BATCH_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream(req=None):
+    """Клиент просит потоковый ответ: ?stream=1 или Accept: application/x-ndjson"""
+    req = request if req is None else req
+    if req.args.get('stream', '').strip() in ('1', 'true'):
+        return True
+    return req.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_ndjson(db, query, serialize):
+    """
+    Отдать результат запроса построчно в формате NDJSON.
+    Строки читаются пачками через yield_per (на PostgreSQL — серверный курсор),
+    поэтому память не зависит от размера выборки, а первый байт уходит сразу.
+    Сессия закрывается, когда поток дочитан или клиент отключился.
+    """
+    def generate():
+        try:
+            for obj in query.yield_per(STREAM_BATCH_SIZE):
+                yield json.dumps(serialize(obj), ensure_ascii=False) + '\n'
+        finally:
+            db.close()
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def serialize_rows(rows, serialize):
+    """Список словарей для JSON; время построения идёт в фазу serialize (metrics.py)"""
+    with timed('serialize'):
+        return [serialize(r) for r in rows]
+
+
+# --- Выборка по id (?ids=1,2,3) ---
+MAX_IDS = MAX_PAGE_SIZE
+
+
+def parse_ids(args):
+    """Список id из ?ids= без повторов (порядок сохраняется) или None, если параметра нет"""
+    raw = args.get('ids')
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    except ValueError:
+        raise PageError("Invalid ids")
+    if not ids or len(ids) > MAX_IDS:
+        raise PageError(f"ids must contain 1..{MAX_IDS} values")
+    return ids
+
+
+def multi_get(query, id_col, ids, serialize):
+    """Строки с указанными id одним запросом, в порядке ids; отсутствующие пропускаются"""
+    rows = {getattr(r, id_col.key): r for r in query.filter(id_col.in_(ids)).all()}
+    return serialize_rows((rows[i] for i in ids if i in rows), serialize)
+
+
+def get_one(query, id_col, row_id, serialize):
+    row = query.filter(id_col == row_id).first()
+    return serialize(row) if row is not None else None
+
+
+def get_one_response(db, query, id_col, row_id, serialize):
+    res = get_one(query, id_col, row_id, serialize)
+    db.close()
+    if res is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(res)
+
+
+def records_query(db):
+    """Записи с ФИО студента и названием курса (одна выборка колонок, см. RECORD_ROW_COLUMNS)"""
+    return db.query(*RECORD_ROW_COLUMNS).select_from(Record).join(Record.student).join(Record.course)
+
+
+# --- Поиск по q с ранжированием ---
+RANKED_SORT = 'rank'  # «сортировка» курсора ранжированной выдачи: в нём смещение, а не ключ строки
+
+
+def ranked_items(db, query, table, q, page, serialize):
+    """
+    Результаты поиска по релевантности. Постранично — по limit, next_cursor
+    хранит смещение следующей страницы (порядок по релевантности не keyset).
+    """
+    if not page:
+        return serialize_rows(ranked_search(db, query, table, q), serialize)
+    limit, cursor = page
+    offset = decode_cursor(cursor, RANKED_SORT)[0] if cursor else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise PageError("Invalid cursor")
+    rows = ranked_search(db, query, table, q, limit + 1, offset)
+    next_cursor = encode_cursor(RANKED_SORT, [offset + limit]) if len(rows) > limit else None
+    return {"items": serialize_rows(rows[:limit], serialize), "next_cursor": next_cursor}
+
+
+# --- Списки: общий код обработчиков Flask и асинхронного режима (asgi.py) ---
+def list_response(listing, serialize):
+    """
+    Ответ списка по request.args: JSON, поток NDJSON (listing вернул запрос)
+    или 400 при неверных limit/cursor/ids.
+    """
     db = SessionLocal()
+    try:
+        res = listing(db, request.args, wants_stream())
+    except PageError as e:
+        db.close()
+        return jsonify({"error": str(e)}), 400
+    if isinstance(res, Query):
+        return stream_ndjson(db, res, serialize)
+    db.close()
+    return jsonify(res)
+
+
+def student_list(db, args, stream=False):
+    """Студенты по параметрам args: q, sort, ids, limit/cursor (PageError — неверные)"""
+    q = args.get('q', '').strip()
+    sort = args.get('sort', 'default')
+    ids = parse_ids(args)
+    page = parse_page_args(args)
     query = db.query(Student)
+    if ids:
+        return multi_get(query, Student.id, ids, Student.to_dict)
+    if q and sort == 'default' and not stream:
+        return ranked_items(db, query, 'students', q, page, Student.to_dict)
     if q:
-        query = query.filter(Student.fio.ilike(f'%{q}%'))
+        query = query.filter(search_filter(db, 'students', q))
+    if page:
+        rows, next_cursor = paginate(query, Student.id, Student.date_of_birth, sort, *page)
+        return {"items": serialize_rows(rows, Student.to_dict), "next_cursor": next_cursor}
     if sort == 'asc':
         query = query.order_by(asc(Student.date_of_birth))
     elif sort == 'desc':
         query = query.order_by(desc(Student.date_of_birth))
-    students = [s.to_dict() for s in query.all()]
-    db.close()
-    return jsonify(students)
+    if stream:
+        return query
+    return serialize_rows(query.all(), Student.to_dict)
+
+
+def course_list(db, args, stream=False):
+    """Курсы по параметрам args: q, teacher, ids, limit/cursor"""
+    q = args.get('q', '').strip()
+    teacher = args.get('teacher', '').strip()
+    ids = parse_ids(args)
+    page = parse_page_args(args)
+    query = db.query(Course)
+    if ids:
+        return multi_get(query, Course.id, ids, Course.to_dict)
+    if teacher:
+        query = query.filter(Course.teacher == teacher)
+    if q and not stream:
+        return ranked_items(db, query, 'courses', q, page, Course.to_dict)
+    if q:
+        query = query.filter(search_filter(db, 'courses', q))
+    if page:
+        rows, next_cursor = paginate(query, Course.id, None, 'default', *page)
+        return {"items": serialize_rows(rows, Course.to_dict), "next_cursor": next_cursor}
+    if stream:
+        return query
+    return serialize_rows(query.all(), Course.to_dict)
+
+
+def record_list(db, args, stream=False):
+    """Записи по параметрам args: q, course_id, sort, ids, limit/cursor"""
+    q = args.get('q', '').strip()
+    course_id = args.get('course_id', '').strip()
+    sort = args.get('sort', 'default')
+    ids = parse_ids(args)
+    page = parse_page_args(args)
+    # Одна выборка колонок вместо Record + ленивых SELECT студента и курса
+    query = records_query(db)
+    if ids:
+        return multi_get(query, Record.id, ids, record_row_to_dict)
+    if q:
+        query = query.filter(or_(search_filter(db, 'students', q), search_filter(db, 'courses', q)))
+    if course_id:
+        try:
+            cid = int(course_id)
+            query = query.filter(Record.course_id == cid)
+        except ValueError:
+            pass
+    if page:
+        rows, next_cursor = paginate(query, Record.id, Record.date, sort, *page)
+        return {"items": serialize_rows(rows, record_row_to_dict), "next_cursor": next_cursor}
+    if sort == 'asc':
+        query = query.order_by(asc(Record.date))
+    elif sort == 'desc':
+        query = query.order_by(desc(Record.date))
+    if stream:
+        return query
+    return serialize_rows(query.all(), record_row_to_dict)
+
+
+# --- Условный GET (ETag по версиям таблиц) ---
+def conditional(*tables):
+    """
+    ETag ответа строится из версий tables (versions.py), которые читаются до
+    основного запроса. Если клиент прислал совпадающий If-None-Match —
+    304 без выполнения обработчика.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            db = SessionLocal()
+            try:
+                versions = get_versions(db, tables)
+            finally:
+                db.close()
+            g.table_versions = versions
+            etag = make_etag(tables, versions, 'ndjson' if wants_stream() else None)
+            for tag in [etag] + [f"{etag}-{enc}" for enc in ENCODING_SUFFIXES]:
+                if tag in request.if_none_match:
+                    response = Response(status=304)
+                    response.set_etag(tag)
+                    response.vary.add('Accept-Encoding')
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def cached(*tables):
+    """
+    Read-through кеш ответа списка (query_cache.py). Ставится под @conditional:
+    ключ включает версии таблиц, прочитанные им. Потоковые ответы не кешируются.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if wants_stream():
+                return view(*args, **kwargs)
+            cache = get_cache()
+            key = cache_key(request.path, request.args, g.table_versions)
+            body = cache.get(key)
+            if body is not None:
+                return Response(body, mimetype='application/json')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(key, response.get_data(), tables)
+            return response
+        return wrapper
+    return decorator
+
+
+# --- Чтение с реплик (replicas.py) ---
+PRIMARY_COOKIE = 'read_primary'
+
+
+def replica_read(view):
+    """
+    Запросы обработчика (и потока ответа) идут на реплику, если они настроены.
+    Клиент, недавно писавший сам (cookie PRIMARY_COOKIE), читает из primary —
+    видит свои изменения, даже если реплика ещё отстаёт.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.cookies.get(PRIMARY_COOKIE):
+            return view(*args, **kwargs)
+        with reading():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def replicas_configured():
+    return bool(SessionLocal.session_factory.kw.get('replicas'))
+
+
+@api.after_request
+def stick_to_primary(response):
+    """После успешной записи клиент REPLICA_STICKY_SECONDS читает из primary"""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400 and replicas_configured():
+        response.set_cookie(PRIMARY_COOKIE, '1', max_age=REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+
+@api.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Счётчики кеша списков"""
+    cache = get_cache()
+    res = {"backend": type(cache).__name__, **cache.stats.snapshot()}
+    if hasattr(cache, '__len__'):
+        res["entries"] = len(cache)
+    return jsonify(res)
+
+
+# ===============================
+# === STUDENTS (Студенты) ======
+# ===============================
+@api.route('/students', methods=['GET'])
+@replica_read
+@conditional('students')
+@cached('students')
+def list_students():
+    """Получить список студентов с фильтрацией и сортировкой"""
+    return list_response(student_list, Student.to_dict)
+
+
+@api.route('/students/<int:student_id>', methods=['GET'])
+@conditional('students')
+def get_student(student_id):
+    """Получить одного студента"""
+    db = SessionLocal()
+    return get_one_response(db, db.query(Student), Student.id, student_id, Student.to_dict)
 
 
 @api.route('/students', methods=['POST'])
 def create_student():
     """Создать нового студента"""
     data = request.json
-    db = SessionLocal()
     try:
-        dob = datetime.fromisoformat(data['date_of_birth']).date()
+        dob = parse_date(data['date_of_birth'])
     except Exception:
         return jsonify({"error": "Invalid date_of_birth"}), 400
+    db = SessionLocal()
     student = Student(fio=data['fio'], date_of_birth=dob, phone=data.get('phone'))
+    stamp(db, student)
     db.add(student)
+    bump_versions(db, 'students')
     db.commit()
+    invalidate_cache('students')
     db.refresh(student)
     res = student.to_dict()
+    index_upsert(db, 'students', student.id, student.fio)
     db.close()
     return jsonify(res), 201
 
@@ -89,10 +491,14 @@ def update_student(student_id):
         return jsonify({"error": "Not found"}), 404
     student.fio = data.get('fio', student.fio)
     if data.get('date_of_birth'):
-        student.date_of_birth = datetime.fromisoformat(data['date_of_birth']).date()
+        student.date_of_birth = parse_date(data['date_of_birth'])
     student.phone = data.get('phone', student.phone)
+    stamp(db, student)
+    bump_versions(db, 'students')
     db.commit()
+    invalidate_cache('students')
     res = student.to_dict()
+    index_upsert(db, 'students', student.id, student.fio)
     db.close()
     return jsonify(res)
 
@@ -105,8 +511,16 @@ def delete_student(student_id):
     if not student:
         db.close()
         return jsonify({"error": "Not found"}), 404
+    untrack_where(db, Record.id_student == student_id)
+    tombstone_where(db, 'records', Record.id_student == student_id)
+    tombstone(db, 'students', [student_id])
+    # записи — одним DELETE, без загрузки в сессию (на PostgreSQL то же сделал бы ON DELETE CASCADE)
+    db.query(Record).filter(Record.id_student == student_id).delete(synchronize_session=False)
     db.delete(student)
+    bump_versions(db, 'students', 'records')
     db.commit()
+    invalidate_cache('students', 'records')
+    index_remove(db, 'students', student_id)
     db.close()
     return jsonify({"status": "deleted"})
 
@@ -115,19 +529,20 @@ def delete_student(student_id):
 # === COURSES (Курсы) ==========
 # ===============================
 @api.route('/courses', methods=['GET'])
+@replica_read
+@conditional('courses')
+@cached('courses')
 def list_courses():
     """Список курсов"""
-    q = request.args.get('q', '').strip()
-    teacher = request.args.get('teacher', '').strip()
+    return list_response(course_list, Course.to_dict)
+
+
+@api.route('/courses/<int:course_id>', methods=['GET'])
+@conditional('courses')
+def get_course(course_id):
+    """Получить один курс"""
     db = SessionLocal()
-    query = db.query(Course)
-    if q:
-        query = query.filter(Course.name.ilike(f'%{q}%'))
-    if teacher:
-        query = query.filter(Course.teacher == teacher)
-    courses = [c.to_dict() for c in query.all()]
-    db.close()
-    return jsonify(courses)
+    return get_one_response(db, db.query(Course), Course.id, course_id, Course.to_dict)
 
 
 @api.route('/courses', methods=['POST'])
@@ -136,10 +551,14 @@ def create_course():
     data = request.json
     db = SessionLocal()
     course = Course(name=data['name'], description=data.get('description'), teacher=data.get('teacher'))
+    stamp(db, course)
     db.add(course)
+    bump_versions(db, 'courses')
     db.commit()
+    invalidate_cache('courses')
     db.refresh(course)
     res = course.to_dict()
+    index_upsert(db, 'courses', course.id, course.name)
     db.close()
     return jsonify(res), 201
 
@@ -156,8 +575,12 @@ def update_course(course_id):
     course.name = data.get('name', course.name)
     course.description = data.get('description', course.description)
     course.teacher = data.get('teacher', course.teacher)
+    stamp(db, course)
+    bump_versions(db, 'courses')
     db.commit()
+    invalidate_cache('courses')
     res = course.to_dict()
+    index_upsert(db, 'courses', course.id, course.name)
     db.close()
     return jsonify(res)
 
@@ -170,8 +593,16 @@ def delete_course(course_id):
     if not course:
         db.close()
         return jsonify({"error": "Not found"}), 404
+    untrack_where(db, Record.course_id == course_id)
+    tombstone_where(db, 'records', Record.course_id == course_id)
+    tombstone(db, 'courses', [course_id])
+    # записи — одним DELETE, без загрузки в сессию (на PostgreSQL то же сделал бы ON DELETE CASCADE)
+    db.query(Record).filter(Record.course_id == course_id).delete(synchronize_session=False)
     db.delete(course)
+    bump_versions(db, 'courses', 'records')
     db.commit()
+    invalidate_cache('courses', 'records')
+    index_remove(db, 'courses', course_id)
     db.close()
     return jsonify({"status": "deleted"})
 
@@ -180,28 +611,20 @@ def delete_course(course_id):
 # === RECORDS (Записи) =========
 # ===============================
 @api.route('/records', methods=['GET'])
+@replica_read
+@conditional('records', 'students', 'courses')
+@cached('records', 'students', 'courses')
 def list_records():
     """Список записей"""
-    q = request.args.get('q', '').strip()
-    course_id = request.args.get('course_id', '').strip()
-    sort = request.args.get('sort', 'default')
+    return list_response(record_list, record_row_to_dict)
+
+
+@api.route('/records/<int:rec_id>', methods=['GET'])
+@conditional('records', 'students', 'courses')
+def get_record(rec_id):
+    """Получить одну запись (с ФИО студента и названием курса)"""
     db = SessionLocal()
-    query = db.query(Record).join(Record.student).join(Record.course)
-    if q:
-        query = query.filter(or_(Student.fio.ilike(f'%{q}%'), Course.name.ilike(f'%{q}%')))
-    if course_id:
-        try:
-            cid = int(course_id)
-            query = query.filter(Record.course_id == cid)
-        except ValueError:
-            pass
-    if sort == 'asc':
-        query = query.order_by(asc(Record.date))
-    elif sort == 'desc':
-        query = query.order_by(desc(Record.date))
-    results = [r.to_dict() for r in query.all()]
-    db.close()
-    return jsonify(results)
+    return get_one_response(db, records_query(db), Record.id, rec_id, record_row_to_dict)
 
 
 @api.route('/records', methods=['POST'])
@@ -210,12 +633,16 @@ def create_record():
     data = request.json
     db = SessionLocal()
     try:
-        dt = datetime.fromisoformat(data['date']).date()
+        dt = parse_date(data['date'])
     except Exception:
         return jsonify({"error": "Invalid date"}), 400
     rec = Record(id_student=data['id_student'], course_id=data['course_id'], date=dt, grade=data.get('grade'))
+    stamp(db, rec)
+    track(db, added=[stat_row(rec)])
     db.add(rec)
+    bump_versions(db, 'records')
     db.commit()
+    invalidate_cache('records')
     db.refresh(rec)
     res = rec.to_dict()
     db.close()
@@ -231,15 +658,20 @@ def update_record(rec_id):
     if not rec:
         db.close()
         return jsonify({"error": "Not found"}), 404
+    old = stat_row(rec)
     if 'id_student' in data:
         rec.id_student = data['id_student']
     if 'course_id' in data:
         rec.course_id = data['course_id']
     if 'date' in data:
-        rec.date = datetime.fromisoformat(data['date']).date()
+        rec.date = parse_date(data['date'])
     if 'grade' in data:
         rec.grade = data['grade']
+    stamp(db, rec)
+    track(db, added=[stat_row(rec)], removed=[old])
+    bump_versions(db, 'records')
     db.commit()
+    invalidate_cache('records')
     res = rec.to_dict()
     db.close()
     return jsonify(res)
@@ -253,109 +685,261 @@ def delete_record(rec_id):
     if not rec:
         db.close()
         return jsonify({"error": "Not found"}), 404
+    tombstone(db, 'records', [rec_id])
+    track(db, removed=[stat_row(rec)])
     db.delete(rec)
+    bump_versions(db, 'records')
     db.commit()
+    invalidate_cache('records')
     db.close()
     return jsonify({"status": "deleted"})
 
 
+# --- Инкрементальная синхронизация (changes.py) ---
+@api.route('/changes', methods=['GET'])
+def list_changes():
+    """
+    Строки, изменённые после ревизии since, и id удалённых.
+    ?tables=students,courses — только эти таблицы; ?limit= — не больше строк на таблицу.
+    Ответ содержит revision для следующего запроса; has_more — есть ещё изменения.
+    Записи приходят с id_student и course_id без имён — их дают students и courses.
+    """
+    try:
+        since = int(request.args.get('since', '0'))
+        limit = int(request.args.get('limit', DEFAULT_CHANGES_LIMIT))
+    except ValueError:
+        return jsonify({"error": "Invalid since or limit"}), 400
+    if since < 0 or limit <= 0:
+        return jsonify({"error": "Invalid since or limit"}), 400
+    tables = [t for t in request.args.get('tables', ','.join(CHANGE_SOURCES)).split(',') if t]
+    if not tables or any(t not in CHANGE_SOURCES for t in tables):
+        return jsonify({"error": "Invalid tables"}), 400
+    db = SessionLocal()
+    res = collect_changes(db, since, tables, min(limit, MAX_CHANGES_LIMIT))
+    db.close()
+    return jsonify(res)
+
+
+# --- Статистика оценок (analytics.py) ---
+def stats_response(scope, model, row_id):
+    """?from=YYYY-MM&to=YYYY-MM — окно по месяцам включительно (по умолчанию всё время)"""
+    try:
+        start = parse_month(request.args['from']) if request.args.get('from') else None
+        end = parse_month(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"error": "Invalid month, expected YYYY-MM"}), 400
+    db = SessionLocal()
+    if db.get(model, row_id) is None:
+        db.close()
+        return jsonify({"error": "Not found"}), 404
+    res = dict(grade_stats(db, scope, row_id, start, end), **{f"{scope}_id": row_id})
+    db.close()
+    return jsonify(res)
+
+
+@api.route('/stats/courses/<int:course_id>', methods=['GET'])
+def course_stats(course_id):
+    """Средняя оценка, распределение, «Не оценено» и помесячная динамика по курсу"""
+    return stats_response('course', Course, course_id)
+
+
+@api.route('/stats/students/<int:student_id>', methods=['GET'])
+def student_stats(student_id):
+    """То же по студенту (все курсы)"""
+    return stats_response('student', Student, student_id)
+
+
+# --- Пакетные операции с записями (bulk.py) ---
+def run_bulk(payload_key, validate, write):
+    """
+    Проверить всю пачку, записать корректные элементы одной транзакцией.
+    С "atomic": true при любой ошибке ничего не пишется (400).
+    Возвращает (результат write, ошибки по индексам) или готовый ответ с ошибкой.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, None, (jsonify({"error": "Expected a JSON object"}), 400)
+    db = SessionLocal()
+    try:
+        rows, errors = validate(db, data.get(payload_key))
+    except BulkError as e:
+        db.close()
+        return None, None, (jsonify({"error": str(e)}), 400)
+    errors.sort(key=lambda e: e["index"])
+    if errors and data.get('atomic'):
+        db.close()
+        return None, None, (jsonify({"errors": errors}), 400)
+    try:
+        result = write(db, rows)
+        if rows:
+            bump_versions(db, 'records')
+        db.commit()
+    except IntegrityError:
+        # студент или курс удалены между проверкой и записью
+        db.rollback()
+        db.close()
+        return None, None, (jsonify({"error": "Conflicting concurrent change, retry"}), 409)
+    if rows:
+        invalidate_cache('records')
+    db.close()
+    return result, errors, None
+
+
+@api.route('/records/batch', methods=['POST'])
+def create_records_batch():
+    """Создать пачку записей: {"records": [{id_student, course_id, date, grade}, ...], "atomic": false}"""
+    result, errors, failed = run_bulk('records', validate_create,
+                                      lambda db, rows: (rows, insert_records(db, rows)))
+    if failed:
+        return failed
+    rows, new_ids = result
+    ids = [None] * len(request.json['records'])
+    for (index, _), new_id in zip(rows, new_ids):
+        ids[index] = new_id
+    return jsonify({"ids": ids, "errors": errors}), (200 if errors else 201)
+
+
+@api.route('/records/batch', methods=['PUT'])
+def update_records_batch():
+    """Изменить пачку записей: {"records": [{id, ...поля}, ...], "atomic": false}"""
+    updated, errors, failed = run_bulk('records', validate_update, update_records)
+    if failed:
+        return failed
+    return jsonify({"updated": updated, "errors": errors})
+
+
+@api.route('/records/batch', methods=['DELETE'])
+def delete_records_batch():
+    """Удалить пачку записей: {"ids": [...], "atomic": false}"""
+    deleted, errors, failed = run_bulk('ids', validate_delete, delete_records)
+    if failed:
+        return failed
+    return jsonify({"deleted": deleted, "errors": errors})
+
+
+@api.route('/records', methods=['DELETE'])
+def delete_records_by_filter():
+    """
+    Удалить записи по фильтру: ?course_id=&student_id=&from=YYYY-MM-DD&before=YYYY-MM-DD
+    (нужен хотя бы один). Удаление идёт пачками по DELETE_BATCH_SIZE, каждая
+    в своей короткой транзакции, поэтому строки не блокируются надолго.
+    """
+    conditions = []
+    try:
+        for name, column in (('course_id', Record.course_id), ('student_id', Record.id_student)):
+            if request.args.get(name):
+                conditions.append(column == int(request.args[name]))
+        if request.args.get('from'):
+            conditions.append(Record.date >= parse_date(request.args['from']))
+        if request.args.get('before'):
+            conditions.append(Record.date < parse_date(request.args['before']))
+    except ValueError:
+        return jsonify({"error": "Invalid filter"}), 400
+    if not conditions:
+        return jsonify({"error": "At least one filter is required: course_id, student_id, from, before"}), 400
+    db = SessionLocal()
+    deleted = batches = 0
+    try:
+        for count in delete_where(db, conditions, DELETE_BATCH_SIZE):
+            deleted += count
+            batches += 1
+            invalidate_cache('records')
+    finally:
+        db.close()
+    return jsonify({"deleted": deleted, "batches": batches})
+
+
+# --- Импорт CSV/XLSX (importer.py) ---
+@api.route('/import/<table>', methods=['POST'])
+def import_table(table):
+    """
+    Импорт students/courses/records из файла (поле формы file, .csv или .xlsx).
+    ?stream=1 — NDJSON со сводкой после каждой загруженной пачки.
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({"error": "No file"}), 400
+    db = SessionLocal()
+    try:
+        progress = import_rows(db, table, upload.stream, detect_format(upload.filename, request.args.get('format')))
+    except ImportFileError as e:
+        db.close()
+        return jsonify({"error": str(e)}), 400
+
+    def run():
+        try:
+            for summary in progress:
+                yield summary
+        except Exception:
+            db.rollback()  # пачки, загруженные до ошибки, уже закоммичены
+            raise
+        finally:
+            # строки загружены мимо обработчиков записи
+            index_reset(db, table)
+            invalidate_cache(table)
+            db.close()
+
+    if wants_stream():
+        def generate():
+            for summary in run():
+                line = summary if summary["done"] else {k: v for k, v in summary.items() if k != "errors"}
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+        return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    for summary in run():
+        pass
+    return jsonify(summary), (200 if summary["error_count"] else 201)
+
+
+def render_document(render, *args):
+    """
+    Один документ для ответа. При RENDER_IN_POOL (асинхронный режим, asgi.py)
+    рендеринг идёт в пуле процессов: поток только ждёт результат и не держит
+    GIL, который нужен циклу событий.
+    """
+    with timed('render'):
+        if current_app.config.get('RENDER_IN_POOL'):
+            return get_render_pool().submit(render, *args).result()
+        return render(*args)
+
+
 # ===============================
 # === WORD =====================
 # ===============================
 @documents_bp.route("/generate-word/<int:student_id>", methods=["GET"])
+@replica_read
 def generate_word(student_id):
     """Генерация Word-документа"""
+    from word_export import render_application
     db = SessionLocal()
     student = db.query(Student).filter(Student.id == student_id).first()
     if not student:
         db.close()
         return jsonify({"error": "Студент не найден"}), 404
-
-    doc = Document("templates/blank_zayavlenie.docx")
-    for p in doc.paragraphs:
-        p.text = p.text.replace("{FIO}", student.fio).replace("{PHONE}", student.phone or "")
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
+    fio, phone = student.fio, student.phone
     db.close()
-    return send_file(buffer, as_attachment=True, download_name=f"Заявление_{student.fio}.docx")
+
+    buffer = BytesIO(render_document(render_application, fio, phone))
+    return send_file(buffer, as_attachment=True, download_name=f"Заявление_{fio}.docx")
 
 
 # ===============================
 # === EXCEL ====================
 # ===============================
 @excel_bp.route("/generate-excel", methods=["GET"])
+@replica_read
 def generate_excel():
+    from excel_export import write_journal
+    # Книга пишется потоково во временный файл на диске, а не в BytesIO
+    file_stream = tempfile.TemporaryFile()
     session = SessionLocal()
-
-    # Загружаем записи вместе со студентом и курсом (чтобы не было DetachedInstanceError)
-    records = (
-        session.query(Record)
-        .options(joinedload(Record.student), joinedload(Record.course))
-        .all()
-    )
-
-    session.close()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Журнал успеваемости"
-
-    # --- Заголовок ---
-    ws.merge_cells('A1:G1')
-    ws['A1'] = "ЖУРНАЛ УСПЕВАЕМОСТИ"
-    ws['A1'].font = Font(size=16, bold=True, color="1F4E78")
-    ws['A1'].alignment = Alignment(horizontal="center", vertical="center")
-    ws['A1'].fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-
-    # --- Шапка таблицы ---
-    headers = ["ID", "ФИО студента", "Дата рождения", "Телефон", "Курс", "Оценка", "Дата"]
-    ws.append(headers)
-
-    header_fill = PatternFill(start_color="305496", end_color="305496", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    thin = Side(border_style="thin", color="000000")
-
-    for col_num, header in enumerate(headers, start=1):
-        cell = ws.cell(row=2, column=col_num)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.border = Border(top=thin, left=thin, right=thin, bottom=thin)
-
-    # --- Данные ---
-    for record in records:
-        ws.append([
-            record.id,
-            record.student.fio if record.student else "",
-            record.student.date_of_birth.strftime("%d.%m.%Y") if record.student and record.student.date_of_birth else "",
-            record.student.phone if record.student else "",
-            record.course.name if record.course else "",
-            record.grade or "Не оценено",
-            record.date.strftime("%d.%m.%Y") if record.date else ""
-        ])
-
-    # --- Автоширина ---
-    for i, column_cells in enumerate(ws.columns, start=1):
-        col_letter = get_column_letter(i)
-        max_length = 0
-        for cell in column_cells:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = max(15, max_length + 2)
-
-    # --- Подпись и дата ---
-    ws.append([])
-    ws.append([])
-    ws.append(["Подпись преподавателя:", "", "", "", "Дата:", datetime.now().strftime("%d.%m.%Y")])
-    ws["A" + str(ws.max_row)].font = Font(bold=True)
-    ws["E" + str(ws.max_row)].font = Font(bold=True)
-
-    # --- Сохранение ---
-    file_stream = io.BytesIO()
-    wb.save(file_stream)
+    try:
+        with timed('render'):
+            write_journal(session, file_stream)
+    except Exception:
+        file_stream.close()
+        raise
+    finally:
+        session.close()
     file_stream.seek(0)
 
     return send_file(
@@ -368,77 +952,191 @@ def generate_excel():
 # === PDF ======================
 # ===============================
 @pdf_bp.route("/generate-pdf/<int:student_id>", methods=["GET"])
+@replica_read
 def generate_pdf(student_id):
+    from pdf_export import render_consent
     db = SessionLocal()
     student = db.query(Student).filter(Student.id == student_id).first()
     if not student:
         db.close()
         return jsonify({"error": "Студент не найден"}), 404
+    fio, phone = student.fio, student.phone
+    db.close()
 
-    buffer = BytesIO()
-    width, height = A4
+    try:
+        buffer = BytesIO(render_document(render_consent, fio, phone))
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 500
 
-    # Регистрируем шрифт
-    font_path = os.path.join(current_app.root_path, "templates", "DejaVuLGCSans.ttf")
-    if not os.path.exists(font_path):
-        db.close()
-        return jsonify({"error": f"Шрифт не найден: {font_path}"}), 500
-    pdfmetrics.registerFont(TTFont('DejaVu', font_path))
-
-    c = canvas.Canvas(buffer, pagesize=A4)
-
-    # Логотип (прозрачный PNG)
-    logo_path = os.path.join(current_app.root_path, "static", "images", "logo.png")
-    if os.path.exists(logo_path):
-        c.drawImage(logo_path, width - 4*cm, height - 4*cm, width=3*cm, height=3*cm, mask='auto')
-
-        # Заголовок
-    c.setFont("DejaVu", 16)
-    title_y = height - 5*cm
-    c.drawCentredString(width/2, title_y, "СОГЛАСИЕ НА ОБРАБОТКУ ПЕРСОНАЛЬНЫХ ДАННЫХ")
-
-
-    style = ParagraphStyle(
-        name="Justify",
-        fontName="DejaVu",
-        fontSize=12,
-        leading=15,        # межстрочный интервал
-        alignment=TA_JUSTIFY,
-        leftIndent=2*cm,
-        rightIndent=2*cm
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=f"Согласие_{fio}.pdf",
+        mimetype='application/pdf'
     )
 
-    text = f"Я, {student.fio}, даю согласие на обработку моих персональных данных в соответствии с действующим законодательством Российской Федерации."
-    p = Paragraph(text, style)
-    w, h = p.wrap(width - 3*cm, height)
-    text_y = title_y - 1*cm  # отступ от заголовка
-    p.drawOn(c, 0.5*cm, text_y - h)
-
-    # Контактный телефон
-    phone_text = f"Контактный телефон: {student.phone or 'не указан'}"
-    p2 = Paragraph(phone_text, style)
-    w2, h2 = p2.wrap(width - 4*cm, height)
-    p2.drawOn(c, 0.5*cm, text_y - h - 0.5*cm - h2)
-
-    # Подпись-загогулина
-    signature_path = os.path.join(current_app.root_path, "static", "images", "signature.png")
-    if os.path.exists(signature_path):
-        c.drawImage(signature_path, 2*cm, 4*cm, width=6*cm, height=2*cm, mask='auto')
+
+# --- Пакетная генерация документов ---
+MAX_BATCH_DOCUMENTS = 10000
+BATCH_AHEAD = 32          # сколько документов рендерится наперёд в пуле
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def batch_students(db, data):
+    """
+    Студенты для пакетной генерации одним запросом: {"course_id": N}
+    (все, у кого есть записи на курс) или {"student_ids": [...]}.
+    Возвращает список (id, fio, phone) или строку с ошибкой.
+    """
+    query = db.query(Student.id, Student.fio, Student.phone)
+    if data.get('course_id') is not None:
+        if not isinstance(data['course_id'], int):
+            return "Invalid course_id"
+        query = query.join(Record, Record.id_student == Student.id) \
+            .filter(Record.course_id == data['course_id']).distinct()
+    elif data.get('student_ids') is not None:
+        ids = data['student_ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return "Invalid student_ids"
+        query = query.filter(Student.id.in_(ids))
     else:
-        c.drawString(2*cm, 5*cm, "Подпись: ____________________________")
+        return "course_id or student_ids required"
+    students = query.order_by(Student.id).limit(MAX_BATCH_DOCUMENTS + 1).all()
+    if len(students) > MAX_BATCH_DOCUMENTS:
+        return f"Too many documents (max {MAX_BATCH_DOCUMENTS})"
+    if not students:
+        return "No students found"
+    return students
+
 
-    # Дата
-    date_text = f"Дата: {datetime.now().strftime('%d.%m.%Y')}"
-    c.drawString(2*cm, 3*cm, date_text)
+def stream_file(path):
+    """Отдать файл кусками и удалить его после отправки"""
+    try:
+        with open(path, 'rb') as fh:
+            while True:
+                chunk = fh.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
 
-    c.showPage()
-    c.save()
-    buffer.seek(0)
+
+@pdf_bp.route("/generate-pdf/batch", methods=["POST"])
+@replica_read
+def generate_pdf_batch():
+    """Согласия для курса или списка студентов: один PDF (format=pdf) или ZIP (format=zip)"""
+    from pdf_export import render_consent, render_consents_file
+    data = request.json or {}
+    fmt = data.get('format', 'zip')
+    if fmt not in ('zip', 'pdf'):
+        return jsonify({"error": "format must be zip or pdf"}), 400
+    db = SessionLocal()
+    students = batch_students(db, data)
+    db.close()
+    if isinstance(students, str):
+        return jsonify({"error": students}), 400
+
+    pool = get_render_pool()
+    date_tag = datetime.now().strftime('%Y%m%d')
+    if fmt == 'pdf':
+        # Один многостраничный файл: рендерится одним воркером пула во временный файл
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        try:
+            pool.submit(render_consents_file, [(s.fio, s.phone) for s in students], path).result()
+        except Exception:
+            os.remove(path)
+            raise
+        return Response(stream_file(path), mimetype='application/pdf',
+                        headers={"Content-Disposition": f"attachment; filename=consents_{date_tag}.pdf"})
+
+    # ZIP: документы рендерятся параллельно и уходят в архив по мере готовности
+    pages = ordered_map(pool, render_consent, ((s.fio, s.phone) for s in students), BATCH_AHEAD)
+    entries = ((f"{s.id}_{safe_filename(s.fio)}.pdf", pdf) for s, pdf in zip(students, pages))
+    # PDF уже сжат внутри, повторное сжатие в ZIP только тратит CPU
+    return Response(stream_with_context(stream_zip(entries, zipfile.ZIP_STORED)), mimetype='application/zip',
+                    headers={"Content-Disposition": f"attachment; filename=consents_{date_tag}.zip"})
+
+
+@documents_bp.route("/generate-word/batch", methods=["POST"])
+@replica_read
+def generate_word_batch():
+    """Заявления для курса или списка студентов одним ZIP-архивом"""
+    from word_export import render_application
+    data = request.json or {}
+    db = SessionLocal()
+    students = batch_students(db, data)
     db.close()
+    if isinstance(students, str):
+        return jsonify({"error": students}), 400
+
+    date_tag = datetime.now().strftime('%Y%m%d')
+    docs = ordered_map(get_render_pool(), render_application, ((s.fio, s.phone) for s in students), BATCH_AHEAD)
+    entries = ((f"{s.id}_{safe_filename(s.fio)}.docx", doc) for s, doc in zip(students, docs))
+    # .docx сам является zip-архивом, повторно не сжимаем
+    return Response(stream_with_context(stream_zip(entries, zipfile.ZIP_STORED)), mimetype='application/zip',
+                    headers={"Content-Disposition": f"attachment; filename=applications_{date_tag}.zip"})
+
+
+# ===============================
+# === REPORT JOBS (фоновые) =====
+# ===============================
+def job_to_dict(job):
+    res = {"id": job["id"], "kind": job["kind"], "status": job["status"], "error": job["error"],
+           "status_url": f"/jobs/{job['id']}"}
+    if job["status"] == STATUS_DONE:
+        res["download_url"] = f"/jobs/{job['id']}/download"
+    return res
 
+
+@jobs_bp.route("", methods=["POST"])
+def create_job():
+    """Поставить отчёт в очередь: {"kind": "excel"} или {"kind": "word"|"pdf", "student_id": N}"""
+    data = request.json or {}
+    kind = data.get('kind')
+    if kind == 'excel':
+        params = {}
+        filename = f"journal_{datetime.now().strftime('%Y%m%d')}.xlsx"
+    elif kind in ('word', 'pdf'):
+        db = SessionLocal()
+        student = db.get(Student, data.get('student_id')) if isinstance(data.get('student_id'), int) else None
+        db.close()
+        if not student:
+            return jsonify({"error": "Студент не найден"}), 404
+        params = {"fio": student.fio, "phone": student.phone}
+        filename = f"Заявление_{student.fio}.docx" if kind == 'word' else f"Согласие_{student.fio}.pdf"
+    else:
+        return jsonify({"error": "Unknown report kind"}), 400
+
+    try:
+        job, created = get_queue().submit(kind, params, filename)
+    except QueueFull:
+        return jsonify({"error": "Too many pending reports"}), 503
+    return jsonify(job_to_dict(job)), 202 if created else 200
+
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Статус задания"""
+    job = get_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(job_to_dict(job))
+
+
+@jobs_bp.route("/<job_id>/download", methods=["GET"])
+def download_job(job_id):
+    """Скачать готовый отчёт"""
+    queue = get_queue()
+    job = queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Not found"}), 404
+    if job["status"] != STATUS_DONE:
+        return jsonify(job_to_dict(job)), 409
     return send_file(
-        buffer,
+        queue.result_path(job_id, job["kind"]),
         as_attachment=True,
-        download_name=f"Согласие_{student.fio}.pdf",
-        mimetype='application/pdf'
-    )
\ No newline at end of file
+        download_name=job["filename"],
+        mimetype=REPORT_KINDS[job["kind"]][1]
+    )
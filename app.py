@@ -1,29 +1,35 @@
 # app.py
 from flask import Flask, render_template
 from flask_cors import CORS
-from config import SECRET_KEY
+from config import SECRET_KEY, METRICS_PROFILE
 from models import init_db
-from api import api, documents_bp, excel_bp, pdf_bp  # твои CRUD-эндпоинты и генерация документов
+from metrics import init_app as init_metrics
+from api import api, documents_bp, excel_bp, pdf_bp, jobs_bp  # твои CRUD-эндпоинты и генерация документов
 
 def create_app():
     app = Flask(__name__)
     app.config['SECRET_KEY'] = SECRET_KEY
     CORS(app)
+    init_metrics(app, profile=METRICS_PROFILE)  # /metrics и X-Profile
 
     # Регистрируем blueprints
     app.register_blueprint(api)
     app.register_blueprint(documents_bp)
     app.register_blueprint(excel_bp)
     app.register_blueprint(pdf_bp)
+    app.register_blueprint(jobs_bp)
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Применить миграции схемы (то же, что python migrations.py upgrade)"""
+        init_db()
 
     return app
 
+# Схема БД не трогается при импорте: воркеры стартуют и без доступной базы.
+# Миграции — отдельным шагом: flask --app app init-db или python migrations.py upgrade
 app = create_app()
 
-# Инициализация таблиц
-with app.app_context():
-    init_db()
-
 # --- Page routes ---
 @app.route('/')
 def records_page():
@@ -46,4 +52,5 @@ def delete_page():
     return render_template('delete.html')
 
 if __name__ == '__main__':
+    init_db()  # локальный запуск python app.py — сразу с актуальной схемой
     app.run(debug=True, host='0.0.0.0', port=5000)
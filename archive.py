@@ -0,0 +1,45 @@
+# archive.py
+"""Потоковая сборка ZIP-архива: куски отдаются клиенту по мере добавления файлов"""
+import io
+import re
+import zipfile
+
+
+class _Sink(io.RawIOBase):
+    """Файл только для записи без seek: zipfile пишет в него, мы забираем накопленное"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """
+    Генератор байтов ZIP-архива из (имя, содержимое).
+    Каждый файл отдаётся сразу после добавления, архив целиком в памяти не хранится.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=compression) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
+
+
+def safe_filename(name):
+    """Убрать из имени файла символы, недопустимые в архивах и файловых системах"""
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", name).strip() or "_"
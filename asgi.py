@@ -0,0 +1,314 @@
+# asgi.py
+"""
+Асинхронный режим (ASGI) для JSON API: uvicorn asgi:app --workers 4
+
+Горячие чтения /api (списки и карточки студентов, курсов, записей)
+обслуживаются в цикле событий через асинхронный движок SQLAlchemy
+(psycopg в async-режиме; для SQLite — aiosqlite), поэтому ожидание базы
+не занимает поток. Запросы строят те же функции, что и обработчики Flask
+(student_list, course_list, record_list, get_one в api.py), внутри
+AsyncSession.run_sync — фильтры, сортировка, курсоры, ETag и кеш списков
+совпадают с синхронным режимом.
+
+Всё остальное — запись, потоки NDJSON, генерация документов, задания,
+/metrics, запросы с Origin (CORS), а вне PostgreSQL и поиск по q (n-граммный
+индекс search.py читается через синхронный движок под блокировкой потоков,
+которую нельзя держать внутри run_sync) — выполняет приложение Flask (app.py)
+в пуле из ASGI_SYNC_THREADS потоков. Ожидание ввода-вывода в этих потоках
+цикл событий не задерживает, но код на Python в них делит с ним GIL.
+Поэтому одиночные документы (/documents/generate-word, /pdf/generate-pdf)
+в этом режиме рендерятся в пуле процессов jobs.get_render_pool()
+(RENDER_IN_POOL), пакетные — там же всегда. Журнал Excel (/excel) пишется
+из сессии в потоке Flask и занимает GIL на всё время выгрузки — для больших
+журналов есть фоновые задания /jobs.
+
+Чтение с реплик (replicas.py) в асинхронном режиме не используется —
+списки читаются из основной базы.
+
+Нужны пакеты uvicorn и greenlet (и aiosqlite для SQLite), см. requirements.txt.
+"""
+import io
+import re
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from werkzeug.wrappers import Request
+from config import (DATABASE_URI, ASYNC_DATABASE_URI, ASGI_SYNC_THREADS, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+                    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS)
+from models import Student, Course, Record, record_row_to_dict
+from pooling import engine_options
+from versions import get_versions, make_etag
+from compression import compress_response, ENCODING_SUFFIXES
+from query_cache import get_cache, cache_key, MemoryBackend
+from metrics import observe_request
+from api import student_list, course_list, record_list, get_one, records_query, wants_stream, PageError
+
+STREAM_BUFFER = 16  # частей ответа Flask в очереди до отправки клиенту
+
+
+def _student(db, row_id):
+    return get_one(db.query(Student), Student.id, row_id, Student.to_dict)
+
+
+def _course(db, row_id):
+    return get_one(db.query(Course), Course.id, row_id, Course.to_dict)
+
+
+def _record(db, row_id):
+    return get_one(records_query(db), Record.id, row_id, record_row_to_dict)
+
+
+# путь -> (endpoint для метрик, таблицы ETag, функция (db, args))
+LIST_ROUTES = {
+    "/api/students": ("api.list_students", ("students",), student_list),
+    "/api/courses": ("api.list_courses", ("courses",), course_list),
+    "/api/records": ("api.list_records", ("records", "students", "courses"), record_list),
+}
+# (шаблон пути, endpoint, таблицы ETag, функция (db, id))
+ITEM_ROUTES = (
+    (re.compile(r"/api/students/(\d+)"), "api.get_student", ("students",), _student),
+    (re.compile(r"/api/courses/(\d+)"), "api.get_course", ("courses",), _course),
+    (re.compile(r"/api/records/(\d+)"), "api.get_record", ("records", "students", "courses"), _record),
+)
+
+
+def async_database_url(url):
+    """URL для create_async_engine: psycopg в async-режиме для PostgreSQL, aiosqlite для SQLite"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+psycopg")
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def create_async_db_engine(url=None):
+    """Асинхронный движок с параметрами пула из config.py"""
+    url = async_database_url(url or ASYNC_DATABASE_URI or DATABASE_URI)
+    options = engine_options(url, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+                             DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS)
+    options.pop("poolclass", None)  # TimedQueuePool синхронный; у async-движка свой AsyncAdaptedQueuePool
+    return create_async_engine(url, **options)
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ для HTTP-запроса ASGI"""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for raw_name, raw_value in scope.get("headers", ()):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        value = raw_value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if body:
+        environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+class AsyncAPI:
+    """ASGI-приложение: чтения из LIST_ROUTES/ITEM_ROUTES — асинхронно, остальное — Flask в пуле потоков"""
+
+    def __init__(self, flask_app, engine, threads=ASGI_SYNC_THREADS):
+        self.flask = flask_app
+        flask_app.config["RENDER_IN_POOL"] = True  # документы — в пуле процессов, см. render_document в api.py
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="asgi-flask")
+        self.sql_search = engine.dialect.name == "postgresql"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return  # websocket и прочее не поддерживаются
+        route, arg = self.match(scope)
+        if route is None:
+            return await self.run_flask(scope, receive, send)
+        req = Request(wsgi_environ(scope, b""))
+        if (wants_stream(req) or "Origin" in req.headers or "X-Profile" in req.headers
+                or (not self.sql_search and req.args.get("q", "").strip())):
+            return await self.run_flask(scope, receive, send)
+        await self.handle(req, route, arg, send)
+
+    def match(self, scope):
+        """(маршрут, id или None) для асинхронных чтений, иначе (None, None)"""
+        if scope["method"] != "GET":
+            return None, None
+        path = scope["path"]
+        if path in LIST_ROUTES:
+            return LIST_ROUTES[path], None
+        for pattern, endpoint, tables, fetch in ITEM_ROUTES:
+            found = pattern.fullmatch(path)
+            if found:
+                return (endpoint, tables, fetch), int(found.group(1))
+        return None, None
+
+    # --- асинхронные чтения ---
+    async def handle(self, req, route, row_id, send):
+        start = time.perf_counter()
+        try:
+            response = await self.respond(req, route, row_id)
+        except Exception:
+            self.flask.logger.exception("Unhandled error in %s %s", req.method, req.full_path)
+            response = self.flask.response_class(status=500)
+        compress_response(response, req)
+        body = b"".join(response.get_app_iter(req.environ))
+        headers = response.get_wsgi_headers(req.environ).to_wsgi_list()
+        observe_request(route[0], req.method, response.status_code, time.perf_counter() - start, len(body))
+        await send({"type": "http.response.start", "status": response.status_code,
+                    "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def respond(self, req, route, row_id):
+        """Ответ с той же семантикой, что у @conditional/@cached и обработчика Flask"""
+        _, tables, fetch = route
+        async with self.sessions() as session:
+            versions = await session.run_sync(get_versions, tables)
+            etag = make_etag(tables, versions)
+            for tag in [etag] + [f"{etag}-{enc}" for enc in ENCODING_SUFFIXES]:
+                if tag in req.if_none_match:
+                    response = self.flask.response_class(status=304)
+                    response.set_etag(tag)
+                    response.vary.add("Accept-Encoding")
+                    response.headers["Cache-Control"] = "no-cache"
+                    return response
+            if row_id is not None:
+                res = await session.run_sync(fetch, row_id)
+                response = self.json(res) if res is not None else self.json({"error": "Not found"}, 404)
+            else:
+                cache = get_cache()
+                key = cache_key(req.path, req.args, versions)
+                body = await self.cache_call(cache.get, key)
+                if body is not None:
+                    response = self.flask.response_class(body, mimetype="application/json")
+                else:
+                    try:
+                        response = self.json(await session.run_sync(fetch, req.args))
+                    except PageError as e:
+                        return self.json({"error": str(e)}, 400)
+                    await self.cache_call(cache.set, key, response.get_data(), tables)
+        if response.status_code == 200:
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def json(self, data, status=200):
+        response = self.flask.json.response(data)
+        response.status_code = status
+        return response
+
+    async def cache_call(self, method, *args):
+        """Кеш в памяти — сразу, сетевой (Redis) — в пуле потоков"""
+        if isinstance(method.__self__, MemoryBackend):
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+
+    # --- остальное: приложение Flask в пуле потоков ---
+    async def run_flask(self, scope, receive, send):
+        """
+        Запрос целиком обрабатывает Flask в потоке пула. Части ответа (в том
+        числе поток NDJSON) передаются через очередь на STREAM_BUFFER частей:
+        медленный клиент притормаживает генерацию, а не копит ответ в памяти.
+        """
+        environ = wsgi_environ(scope, await read_body(receive))
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(STREAM_BUFFER)
+        stop = threading.Event()
+
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put(("start", int(status.split(" ", 1)[0]), headers))
+
+        def produce():
+            try:
+                result = self.flask(environ, start_response)
+                try:
+                    for chunk in result:
+                        if stop.is_set():
+                            break
+                        if chunk:
+                            put(("body", chunk))
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            finally:
+                put(None)
+
+        done = loop.run_in_executor(self.executor, produce)
+        started = finished = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    finished = True
+                    break
+                if item[0] == "start":
+                    started = True
+                    await send({"type": "http.response.start", "status": item[1],
+                                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in item[2]]})
+                else:
+                    await send({"type": "http.response.body", "body": item[1], "more_body": True})
+            if started:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            stop.set()
+            while not finished:  # дать потоку дописать в очередь и закрыть ответ
+                finished = await queue.get() is None
+            await done  # исключение обработчика (если Flask его не перехватил) — серверу ASGI
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(flask_app=None, engine=None):
+    """ASGI-приложение поверх приложения Flask (по умолчанию app.app)"""
+    if flask_app is None:
+        from app import app as flask_app
+    return AsyncAPI(flask_app, engine or create_async_db_engine())
+
+
+app = create_asgi_app()
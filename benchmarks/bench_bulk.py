@@ -0,0 +1,63 @@
+# benchmarks/bench_bulk.py
+"""
+Ввод оценок группы: поштучный POST /api/records против POST /api/records/batch.
+
+  single — прежний путь: запрос, commit и refresh на каждую оценку
+           (меряется на --single запросах и пересчитывается на -n)
+  batch  — одна пачка: проверка ссылок одним SELECT, INSERT ... RETURNING
+
+База берётся из DATABASE_URL; по умолчанию — новый временный файл SQLite.
+
+Запуск из корня проекта: python benchmarks/bench_bulk.py [-n 10000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_bulk.db")
+
+from app import app  # noqa: E402
+from models import init_db  # noqa: E402
+
+
+def grades(n, students):
+    return [{"id_student": 1 + i % students, "course_id": 1, "date": "2024-09-01", "grade": "5432"[i % 4]}
+            for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10000, help="число оценок")
+    parser.add_argument("--single", type=int, default=300, help="сколько поштучных запросов мерить")
+    parser.add_argument("--students", type=int, default=30, help="студентов в группе")
+    args = parser.parse_args()
+
+    init_db()
+    client = app.test_client()
+    for i in range(args.students):
+        client.post("/api/students", json={"fio": f"Студент {i}", "date_of_birth": "2005-01-01"})
+    client.post("/api/courses", json={"name": "Физика"})
+
+    start = time.perf_counter()
+    for item in grades(args.single, args.students):
+        assert client.post("/api/records", json=item).status_code == 201
+    single = (time.perf_counter() - start) / args.single * args.n
+
+    body = json.dumps({"records": grades(args.n, args.students)})
+    start = time.perf_counter()
+    response = client.post("/api/records/batch", data=body, content_type="application/json")
+    batch = time.perf_counter() - start
+    assert response.status_code == 201, response.get_json()
+
+    print(f"{args.n} оценок")
+    print(f"single  {single:8.2f} s  (оценка по {args.single} запросам)")
+    print(f"batch   {batch:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
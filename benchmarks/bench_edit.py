@@ -0,0 +1,92 @@
+# benchmarks/bench_edit.py
+"""
+Открытие формы редактирования: сколько байт и времени уходит на одну сущность.
+
+  full list — прежний путь main.js: GET /api/<таблица> целиком и поиск id на клиенте
+  by id     — GET /api/<таблица>/<id>
+  ids       — GET /api/<таблица>?ids=... (пачка из --batch id за один запрос)
+
+База берётся из DATABASE_URL; по умолчанию — временный файл SQLite, который
+заполняется данными (--students, --courses, --records), если он пуст.
+
+Запуск из корня проекта: python benchmarks/bench_edit.py [-n 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bench_edit.db"))
+
+from app import app  # noqa: E402
+from models import engine, init_db, Student, Course, Record  # noqa: E402
+
+TABLES = ("students", "courses", "records")
+
+
+def fill(students, courses, records, seed=1):
+    """Заполнить пустую базу случайными данными одним INSERT на таблицу"""
+    with engine.begin() as conn:
+        if conn.execute(Student.__table__.select().limit(1)).first():
+            return
+        rnd = random.Random(seed)
+        conn.execute(Student.__table__.insert(), [
+            {"id": i, "fio": f"Студентов Студент Студентович {i}",
+             "date_of_birth": date(1995, 1, 1) + timedelta(days=rnd.randrange(3650)),
+             "phone": f"+7 900 {i:07d}"}
+            for i in range(1, students + 1)])
+        conn.execute(Course.__table__.insert(), [
+            {"id": i, "name": f"Курс {i}", "description": "Описание курса " * 5, "teacher": f"Преподаватель {i % 20}"}
+            for i in range(1, courses + 1)])
+        conn.execute(Record.__table__.insert(), [
+            {"id": i, "id_student": rnd.randint(1, students), "course_id": rnd.randint(1, courses),
+             "date": date(2024, 1, 1) + timedelta(days=rnd.randrange(365)), "grade": rnd.choice("2345")}
+            for i in range(1, records + 1)])
+
+
+def measure(client, urls, pick=None):
+    """Среднее время (ms) и объём ответа (байт) на одну открытую форму"""
+    total_bytes = 0
+    start = time.perf_counter()
+    for url, row_id in urls:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        total_bytes += len(response.data)
+        if pick:
+            assert pick(response.get_json(), row_id), url
+    elapsed = time.perf_counter() - start
+    return elapsed / len(urls) * 1000, total_bytes / len(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=50, help="число открытий формы на таблицу")
+    parser.add_argument("--batch", type=int, default=20, help="id в одном запросе ?ids=")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--records", type=int, default=50000)
+    args = parser.parse_args()
+
+    init_db()
+    fill(args.students, args.courses, args.records)
+    client = app.test_client()
+    sizes = {"students": args.students, "courses": args.courses, "records": args.records}
+    rnd = random.Random(2)
+    print(f"{'':10} {'full list':>22} {'by id':>22} {'ids (per row)':>22}")
+    for table in TABLES:
+        ids = [rnd.randint(1, sizes[table]) for _ in range(args.n)]
+        full = measure(client, [(f"/api/{table}", i) for i in ids[:max(1, args.n // 10)]],
+                       lambda data, row_id: any(x["id"] == row_id for x in data))
+        single = measure(client, [(f"/api/{table}/{i}", i) for i in ids])
+        batches = [ids[i:i + args.batch] for i in range(0, len(ids), args.batch)]
+        multi = measure(client, [(f"/api/{table}?ids=" + ",".join(map(str, b)), None) for b in batches])
+        per_row = (multi[0] * len(batches) / len(ids), multi[1] * len(batches) / len(ids))
+        print(f"{table:10} " + " ".join(f"{ms:8.2f} ms {size:9.0f} B" for ms, size in (full, single, per_row)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_pdf.py
+"""
+Задержка генерации одного согласия (pdf_export.render_consent).
+
+  uncached — как было до кеша ресурсов: шрифт регистрируется и PNG
+             декодируются на каждый вызов, картинки кодируются в ASCII85
+  cached   — ресурсы из resources.py, бинарные потоки картинок
+
+Запуск из корня проекта: python benchmarks/bench_pdf.py [-n 50]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resources  # noqa: E402
+import pdf_export  # noqa: E402
+from reportlab import rl_config  # noqa: E402
+
+
+def measure(n, before_each=None):
+    times = []
+    for _ in range(n):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        pdf_export.render_consent("Иванов Иван Иванович", "+7 900 000-00-00")
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "mean_ms": round(statistics.mean(times), 2),
+        "p50_ms": round(times[len(times) // 2], 2),
+        "p95_ms": round(times[int(len(times) * 0.95) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=30, help="число повторов")
+    args = parser.parse_args()
+
+    rl_config.useA85 = 1
+    uncached = measure(args.n, before_each=resources.clear)
+    rl_config.useA85 = 0
+    resources.warm()
+    cached = measure(args.n)
+
+    for name, res in (("uncached", uncached), ("cached", cached)):
+        print(f"{name:9} mean {res['mean_ms']:8.2f} ms   p50 {res['p50_ms']:8.2f} ms   p95 {res['p95_ms']:8.2f} ms")
+    print(f"speedup   x{uncached['mean_ms'] / cached['mean_ms']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_word.py
+"""
+Пропускная способность генерации заявления (word_export.render_application).
+
+  python-docx — прежний путь: открыть и разобрать шаблон, заменить текст
+                абзацев, сохранить
+  template    — предразобранный DocxTemplate из кеша
+
+Запуск из корня проекта: python benchmarks/bench_word.py [-n 200]
+"""
+import os
+import sys
+import time
+import argparse
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document  # noqa: E402
+import word_export  # noqa: E402
+
+
+def python_docx(fio, phone):
+    doc = Document(word_export.TEMPLATE_PATH)
+    for p in doc.paragraphs:
+        p.text = p.text.replace("{FIO}", fio).replace("{PHONE}", phone or "")
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(fn, n):
+    fn("Иванов Иван Иванович", "+7 900 000-00-00")
+    start = time.perf_counter()
+    for _ in range(n):
+        fn("Иванов Иван Иванович", "+7 900 000-00-00")
+    elapsed = time.perf_counter() - start
+    return elapsed / n * 1000, n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200, help="число документов")
+    args = parser.parse_args()
+    for name, fn in (("python-docx", python_docx), ("template", word_export.render_application)):
+        ms, per_sec = measure(fn, args.n)
+        print(f"{name:12} {ms:7.2f} ms/doc   {per_sec:8.0f} docs/s")
+
+
+if __name__ == "__main__":
+    main()
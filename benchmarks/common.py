@@ -0,0 +1,99 @@
+# benchmarks/common.py
+"""
+Общее для бенчмарков: перцентили, сводка замеров и файл результатов.
+
+Файл результатов (--output) — JSON вида
+  {"meta": {...окружение прогона...}, "results": {"<имя>": {"n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", ...}}}
+Два таких файла сравнивает benchmarks/compare.py.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, p):
+    """Перцентиль p (0..100) отсортированного списка, линейная интерполяция"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def summarize(times_ms, **extra):
+    """Сводка по списку длительностей в миллисекундах"""
+    times = sorted(times_ms)
+    res = {
+        "n": len(times),
+        "mean_ms": round(statistics.mean(times), 3) if times else 0.0,
+        "p50_ms": round(percentile(times, 50), 3),
+        "p95_ms": round(percentile(times, 95), 3),
+        "p99_ms": round(percentile(times, 99), 3),
+        "max_ms": round(times[-1], 3) if times else 0.0,
+    }
+    res.update(extra)
+    return res
+
+
+def repeat(func, n, warmup=1, before_each=None):
+    """Вызвать func warmup + n раз, вернуть длительности n замеров (ms); before_each не меряется"""
+    times = []
+    for i in range(warmup + n):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        func()
+        if i >= warmup:
+            times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def print_table(results):
+    print(f"{'':28} {'n':>6} {'mean':>10} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for name, res in results.items():
+        print(f"{name:28} {res['n']:6d} " + " ".join(f"{res[k]:7.2f} ms" for k in ("mean_ms", "p50_ms", "p95_ms", "p99_ms")))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_meta(suite, args, **extra):
+    """Описание прогона: что, где и с какими параметрами меряли"""
+    meta = {
+        "suite": suite,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+    }
+    meta.update(extra)
+    return meta
+
+
+def write_results(path, meta, results):
+    """Сохранить результаты в JSON (path '-' — в stdout)"""
+    data = {"meta": meta, "results": results}
+    if path == "-":
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
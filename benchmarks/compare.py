@@ -0,0 +1,71 @@
+# benchmarks/compare.py
+"""
+Сравнение двух файлов результатов (micro.py / load.py --output).
+
+Для каждого общего случая печатается изменение p50/p95/p99 (и req/s, если
+есть). Регрессия — рост задержки больше --threshold процентов (или падение
+req/s на столько же) при абсолютной разнице больше --min-ms: очень быстрые
+случаи шумят сильнее. Код выхода 1, если есть регрессии, — для CI.
+
+Запуск: python benchmarks/compare.py base.json new.json [--threshold 10] [--metrics p50_ms,p95_ms]
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import load_results  # noqa: E402
+
+DEFAULT_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def compare(base, new, metrics=DEFAULT_METRICS, threshold=10.0, min_ms=0.5):
+    """Список (случай, метрика, было, стало, изменение %, регрессия) по общим случаям"""
+    rows = []
+    for name in base:
+        if name not in new:
+            continue
+        for metric in (*metrics, "rps"):
+            if metric not in base[name] or metric not in new[name]:
+                continue
+            old, cur = base[name][metric], new[name][metric]
+            change = (cur - old) / old * 100 if old else 0.0
+            if metric == "rps":
+                regression = change < -threshold
+            else:
+                regression = change > threshold and cur - old > min_ms
+            rows.append((name, metric, old, cur, change, regression))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="допустимое ухудшение, %%")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="меньшие абсолютные изменения не считаются")
+    parser.add_argument("--metrics", default=",".join(DEFAULT_METRICS))
+    args = parser.parse_args(argv)
+
+    base, new = load_results(args.base), load_results(args.new)
+    for label, data in (("base", base), ("new", new)):
+        meta = data.get("meta", {})
+        print(f"{label:5} {meta.get('suite', '?')} {meta.get('commit') or '-'} {meta.get('time', '')}")
+    if base.get("meta", {}).get("suite") != new.get("meta", {}).get("suite"):
+        print("warning: results come from different suites", file=sys.stderr)
+
+    rows = compare(base["results"], new["results"], args.metrics.split(","), args.threshold, args.min_ms)
+    for name, metric, old, cur, change, regression in rows:
+        mark = "  REGRESSION" if regression else ""
+        print(f"{name:28} {metric:7} {old:10.2f} -> {cur:10.2f}  {change:+7.1f}%{mark}")
+    missing = sorted(set(base["results"]) ^ set(new["results"]))
+    if missing:
+        print("only in one file: " + ", ".join(missing))
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
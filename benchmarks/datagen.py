@@ -0,0 +1,161 @@
+# benchmarks/datagen.py
+"""
+Генератор синтетических данных для бенчмарков и нагрузочных прогонов.
+
+Заполняет пустую базу (DATABASE_URL: SQLite или PostgreSQL) студентами с
+правдоподобными ФИО на кириллице, курсами с преподавателями и оценками.
+Данные детерминированы (--seed): одинаковые параметры дают одинаковую базу,
+поэтому прогоны на разных коммитах сравнимы. Строки пишутся пачками через
+importer.load_chunk — COPY в PostgreSQL, многострочный INSERT в остальных
+СУБД — с ревизиями и агрегатами статистики, как при обычном импорте.
+Память не зависит от объёма.
+
+Запуск из корня проекта:
+  python benchmarks/datagen.py --students 1000000 --courses 10000 --records 50000000
+  python benchmarks/datagen.py --preset small
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func  # noqa: E402
+from models import SessionLocal, Student, Course, init_db  # noqa: E402
+from importer import load_chunk, IMPORT_CHUNK_SIZE  # noqa: E402
+from versions import bump_versions  # noqa: E402
+
+PRESETS = {
+    "small": (5000, 200, 100000),
+    "medium": (100000, 2000, 5000000),
+    "large": (1000000, 10000, 50000000),
+}
+
+SURNAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+            "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров",
+            "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин",
+            "Захаров", "Зайцев", "Соловьёв", "Борисов", "Яковлев", "Григорьев", "Романов", "Воробьёв",
+            "Сергеев", "Кузьмин", "Фролов", "Александров", "Дмитриев", "Королёв", "Гусев", "Киселёв",
+            "Ильин", "Максимов", "Поляков", "Сорокин", "Виноградов", "Ковалёв", "Белов", "Медведев",
+            "Антонов", "Тарасов", "Жуков", "Баранов", "Филиппов", "Комаров", "Давыдов", "Беляев")
+MALE_NAMES = ("Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Артём", "Илья",
+              "Кирилл", "Михаил", "Никита", "Матвей", "Роман", "Егор", "Арсений", "Иван", "Денис",
+              "Евгений", "Даниил", "Тимофей", "Владислав", "Игорь", "Павел", "Константин")
+FEMALE_NAMES = ("Анастасия", "Мария", "Дарья", "Анна", "Елизавета", "Полина", "Виктория", "Екатерина",
+                "Софья", "Александра", "Ксения", "Алиса", "Вероника", "Арина", "Варвара", "Ольга",
+                "Юлия", "Татьяна", "Наталья", "Ирина", "Валерия", "Маргарита", "Алёна", "Кристина")
+# мужское имя отца -> (отчество сына, отчество дочери)
+PATRONYMICS = (("Александрович", "Александровна"), ("Дмитриевич", "Дмитриевна"), ("Сергеевич", "Сергеевна"),
+               ("Андреевич", "Андреевна"), ("Алексеевич", "Алексеевна"), ("Михайлович", "Михайловна"),
+               ("Иванович", "Ивановна"), ("Владимирович", "Владимировна"), ("Николаевич", "Николаевна"),
+               ("Петрович", "Петровна"), ("Евгеньевич", "Евгеньевна"), ("Игоревич", "Игоревна"),
+               ("Викторович", "Викторовна"), ("Олегович", "Олеговна"), ("Юрьевич", "Юрьевна"),
+               ("Павлович", "Павловна"), ("Романович", "Романовна"), ("Константинович", "Константиновна"))
+SUBJECTS = ("Математический анализ", "Линейная алгебра", "Физика", "Химия", "Информатика",
+            "Программирование на Python", "Базы данных", "Компьютерные сети", "Операционные системы",
+            "Теория вероятностей", "Дискретная математика", "История", "Философия", "Экономика",
+            "Английский язык", "Русский язык и культура речи", "Инженерная графика", "Электротехника",
+            "Алгоритмы и структуры данных", "Веб-разработка")
+LEVELS = ("базовый курс", "продвинутый курс", "практикум", "спецкурс")
+GRADES = ("5", "4", "3", "2", "Не оценено")
+GRADE_WEIGHTS = (30, 35, 20, 7, 8)
+YEAR_START = date(2023, 9, 1)
+YEAR_DAYS = 300
+
+
+def fio(rnd):
+    surname = rnd.choice(SURNAMES)
+    male, female = rnd.choice(PATRONYMICS)
+    if rnd.random() < 0.5:
+        return f"{surname} {rnd.choice(MALE_NAMES)} {male}"
+    return f"{surname}а {rnd.choice(FEMALE_NAMES)} {female}"
+
+
+def phone(rnd):
+    if rnd.random() < 0.1:
+        return None
+    return f"+7 9{rnd.randrange(100):02d} {rnd.randrange(1000):03d}-{rnd.randrange(100):02d}-{rnd.randrange(100):02d}"
+
+
+def student_rows(rnd, count):
+    for _ in range(count):
+        yield fio(rnd), date(1998, 1, 1) + timedelta(days=rnd.randrange(3650)), phone(rnd)
+
+
+def course_rows(rnd, count):
+    for i in range(count):
+        name = f"{SUBJECTS[i % len(SUBJECTS)]}, {LEVELS[(i // len(SUBJECTS)) % len(LEVELS)]}"
+        if i >= len(SUBJECTS) * len(LEVELS):
+            name += f" (поток {i // (len(SUBJECTS) * len(LEVELS)) + 1})"
+        description = f"{name}. Лекции, практические занятия и итоговый контроль."
+        yield name, description, fio(rnd)
+
+
+def record_rows(rnd, count, students, courses):
+    """students, courses — диапазоны id (min, max)"""
+    for _ in range(count):
+        yield (rnd.randint(*students), rnd.randint(*courses),
+               YEAR_START + timedelta(days=rnd.randrange(YEAR_DAYS)), rnd.choices(GRADES, GRADE_WEIGHTS)[0])
+
+
+def load(db, table, rows, total, chunk_size):
+    """Записать строки пачками с commit после каждой; прогресс — в stderr"""
+    done, chunk, start = 0, [], time.perf_counter()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            done += _flush(db, table, chunk)
+            chunk = []
+            print(f"\r{table}: {done}/{total}  {done / (time.perf_counter() - start):,.0f} rows/s",
+                  end="", file=sys.stderr)
+    done += _flush(db, table, chunk)
+    print(f"\r{table}: {done}/{total}  {time.perf_counter() - start:.1f} s" + " " * 20, file=sys.stderr)
+
+
+def _flush(db, table, chunk):
+    if not chunk:
+        return 0
+    load_chunk(db, table, chunk)
+    bump_versions(db, table)
+    db.commit()
+    return len(chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="готовые объёмы (students, courses, records)")
+    parser.add_argument("--students", type=int, default=PRESETS["small"][0])
+    parser.add_argument("--courses", type=int, default=PRESETS["small"][1])
+    parser.add_argument("--records", type=int, default=PRESETS["small"][2])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    if args.preset:
+        args.students, args.courses, args.records = PRESETS[args.preset]
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Student.id).first() is not None:
+            print("error: database is not empty", file=sys.stderr)
+            return 1
+        rnd = random.Random(args.seed)
+        load(db, "students", student_rows(rnd, args.students), args.students, args.chunk_size)
+        load(db, "courses", course_rows(rnd, args.courses), args.courses, args.chunk_size)
+        # id выдаёт последовательность: после очистки таблиц они могут начинаться не с 1
+        students = db.query(func.min(Student.id), func.max(Student.id)).one()
+        courses = db.query(func.min(Course.id), func.max(Course.id)).one()
+        if args.records and (students[0] is None or courses[0] is None):
+            print("error: records need at least one student and one course", file=sys.stderr)
+            return 1
+        load(db, "records", record_rows(rnd, args.records, students, courses), args.records, args.chunk_size)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/load.py
+"""
+Нагрузочный прогон запущенного сервера по HTTP: --concurrency потоков
+(по своему соединению на поток) в течение --duration секунд шлют запросы
+сценария — смеси чтений списков, карточек, поиска, статистики и (--writes)
+создания оценок. Ответ читается целиком; ошибки и коды != 2xx
+считаются отдельно. Итог: запросов в секунду и p50/p95/p99 по каждому
+виду запроса и в целом; --output — JSON для compare.py.
+
+Данные на сервере — benchmarks/datagen.py; id берутся из диапазонов
+--students/--courses (как их заполнил генератор).
+
+Запуск: python benchmarks/load.py --url http://localhost:5000 [-c 16] [-d 30]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit, quote
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import summarize, print_table, run_meta, write_results  # noqa: E402
+
+# начала фамилий из datagen.py (импорт datagen потянул бы модели и подключение к БД)
+SEARCH_TERMS = ("Иван", "Смирн", "Кузне", "Петро", "Соко", "Волк", "Лебед", "Павл", "Орло", "Жуко")
+
+# вид запроса -> (вес, метод, функция rnd, args -> (путь, тело))
+SCENARIO = {
+    "students_page": (10, "GET", lambda rnd, a: ("/api/students?limit=50", None)),
+    "student_by_id": (15, "GET", lambda rnd, a: (f"/api/students/{rnd.randint(1, a.students)}", None)),
+    "student_search": (10, "GET", lambda rnd, a: (f"/api/students?q={quote(rnd.choice(SEARCH_TERMS))}&limit=20", None)),
+    "courses_page": (5, "GET", lambda rnd, a: ("/api/courses?limit=50", None)),
+    "records_by_course": (20, "GET", lambda rnd, a: (f"/api/records?course_id={rnd.randint(1, a.courses)}&limit=50", None)),
+    "records_page": (10, "GET", lambda rnd, a: ("/api/records?limit=50&sort=desc", None)),
+    "course_stats": (10, "GET", lambda rnd, a: (f"/api/stats/courses/{rnd.randint(1, a.courses)}", None)),
+}
+WRITE_SCENARIO = {
+    "record_create": (5, "POST", lambda rnd, a: ("/api/records", {
+        "id_student": rnd.randint(1, a.students), "course_id": rnd.randint(1, a.courses),
+        "date": f"2024-0{rnd.randint(1, 6)}-1{rnd.randint(0, 9)}", "grade": rnd.choice("2345")})),
+}
+
+
+class Worker(threading.Thread):
+    def __init__(self, target, args, deadline, seed):
+        super().__init__(daemon=True)
+        self.target, self.args, self.deadline = target, args, deadline
+        self.rnd = random.Random(seed)
+        self.times = {}   # вид -> [ms]
+        self.errors = {}  # вид -> число ошибок
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.target.scheme == "https" else http.client.HTTPConnection
+        return cls(self.target.netloc, timeout=self.args.timeout)
+
+    def run(self):
+        kinds = list(self.args.scenario)
+        weights = [self.args.scenario[k][0] for k in kinds]
+        conn = self._connect()
+        while time.perf_counter() < self.deadline:
+            kind = self.rnd.choices(kinds, weights)[0]
+            _, method, make = self.args.scenario[kind]
+            path, body = make(self.rnd, self.args)
+            headers = {"Accept-Encoding": "gzip"}
+            if body is not None:
+                body = json.dumps(body).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+            start = time.perf_counter()
+            try:
+                conn.request(method, self.target.path.rstrip("/") + path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = 200 <= response.status < 300
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = self._connect()
+            elapsed = (time.perf_counter() - start) * 1000
+            if ok:
+                self.times.setdefault(kind, []).append(elapsed)
+            else:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+        conn.close()
+
+
+def run_load(target, args, concurrency):
+    """Прогрев и прогон: результаты по видам запроса (и "total") и длительность, сек"""
+    if args.warmup:
+        warm = [Worker(target, args, time.perf_counter() + args.warmup, args.seed + 1000 + i)
+                for i in range(concurrency)]
+        for w in warm:
+            w.start()
+        for w in warm:
+            w.join()
+
+    start = time.perf_counter()
+    workers = [Worker(target, args, start + args.duration, args.seed + i) for i in range(concurrency)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    results, everything = {}, []
+    for kind in args.scenario:
+        times = [t for w in workers for t in w.times.get(kind, ())]
+        errors = sum(w.errors.get(kind, 0) for w in workers)
+        if times or errors:
+            results[kind] = summarize(times, errors=errors, rps=round(len(times) / elapsed, 1))
+            everything += times
+    errors = sum(r["errors"] for r in results.values())
+    results["total"] = summarize(everything, errors=errors, rps=round(len(everything) / elapsed, 1))
+    return results, elapsed
+
+
+def add_load_args(parser):
+    """Параметры сценария, общие для load.py и modes.py"""
+    parser.add_argument("-d", "--duration", type=float, default=30, help="секунд")
+    parser.add_argument("--warmup", type=float, default=3, help="секунд прогрева (не учитываются)")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--writes", action="store_true", help="добавить в сценарий создание оценок")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл JSON с результатами ('-' — stdout)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    add_load_args(parser)
+    args = parser.parse_args()
+    args.scenario = dict(SCENARIO, **(WRITE_SCENARIO if args.writes else {}))
+
+    results, elapsed = run_load(urlsplit(args.url), args, args.concurrency)
+    errors = results["total"]["errors"]
+    print_table(results)
+    print(f"{results['total']['rps']} req/s, {errors} errors, {args.concurrency} connections, {elapsed:.1f} s")
+    if args.output:
+        del args.scenario
+        write_results(args.output, run_meta("load", args, url=args.url), results)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# benchmarks/micro.py
+"""
+Микробенчмарки горячих путей в одном процессе (тестовый клиент Flask, без сети).
+
+  to_dict.*   — сериализация строк, которые отдают списки (на --batch строк)
+  list.*      — GET списков: страница keyset, поиск, статистика курса
+                (кеш списков очищается перед каждым запросом — меряется сам запрос)
+  excel       — /excel/generate-excel (весь журнал; --heavy-n повторов)
+  pdf, word   — согласие и заявление одного студента
+
+База берётся из DATABASE_URL; по умолчанию — временный файл SQLite, который
+заполняется benchmarks/datagen.py (--students, --courses, --records), если пуст.
+Результаты печатаются таблицей и (--output) пишутся в JSON для compare.py.
+
+Запуск из корня проекта: python benchmarks/micro.py [-n 50] [--output results.json]
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bench_micro.db"))
+
+from common import repeat, summarize, print_table, run_meta, write_results  # noqa: E402
+import datagen  # noqa: E402
+from app import app  # noqa: E402
+from models import SessionLocal, Student, Course, init_db, engine, record_row_to_dict  # noqa: E402
+from api import records_query  # noqa: E402
+from query_cache import get_cache  # noqa: E402
+
+LIST_URLS = {
+    "list.students": "/api/students?limit=50",
+    "list.students_search": "/api/students?q=иван&limit=50",
+    "list.courses": "/api/courses?limit=50",
+    "list.records": "/api/records?limit=50",
+    "list.records_sorted": "/api/records?limit=50&sort=desc",
+    "list.records_by_course": "/api/records?course_id={course}&limit=50",
+    "stats.course": "/api/stats/courses/{course}",
+}
+DOCUMENT_URLS = {
+    "pdf": "/pdf/generate-pdf/{student}",
+    "word": "/documents/generate-word/{student}",
+}
+
+
+def bench_to_dict(n, batch):
+    db = SessionLocal()
+    try:
+        students = db.query(Student).limit(batch).all()
+        courses = db.query(Course).limit(batch).all()
+        records = records_query(db).limit(batch).all()
+    finally:
+        db.close()
+    cases = {
+        "to_dict.student": lambda: [s.to_dict() for s in students],
+        "to_dict.course": lambda: [c.to_dict() for c in courses],
+        "to_dict.record_row": lambda: [record_row_to_dict(r) for r in records],
+    }
+    return {name: summarize(repeat(func, n), rows=batch) for name, func in cases.items()}
+
+
+def get(client, url):
+    def call():
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        call.size = len(response.data)
+    call.size = 0
+    return call
+
+
+def bench_urls(client, urls, n, ids, before_each=None):
+    results = {}
+    for name, template in urls.items():
+        call = get(client, template.format(**ids))
+        times = repeat(call, n, before_each=before_each)
+        results[name] = summarize(times, bytes=call.size)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=50, help="повторов на случай")
+    parser.add_argument("--heavy-n", type=int, default=3, help="повторов для Excel-журнала")
+    parser.add_argument("--batch", type=int, default=1000, help="строк на замер to_dict")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--only", help="только случаи с этим префиксом (to_dict, list, excel, pdf, word, stats)")
+    parser.add_argument("--output", help="файл JSON с результатами ('-' — stdout)")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    empty = db.query(Student.id).first() is None
+    db.close()
+    if empty:
+        datagen.main(["--students", str(args.students), "--courses", str(args.courses),
+                      "--records", str(args.records)])
+    db = SessionLocal()
+    ids = {"student": db.query(Student.id).order_by(Student.id).first()[0],
+           "course": db.query(Course.id).order_by(Course.id).first()[0]}
+    db.close()
+
+    client = app.test_client()
+    selected = lambda name: not args.only or name.startswith(args.only)  # noqa: E731
+    results = {}
+    if selected("to_dict"):
+        results.update(bench_to_dict(args.n, args.batch))
+    results.update(bench_urls(client, {k: v for k, v in LIST_URLS.items() if selected(k)}, args.n, ids,
+                              before_each=get_cache().clear))
+    if selected("excel"):
+        results.update(bench_urls(client, {"excel": "/excel/generate-excel"}, args.heavy_n, ids))
+    results.update(bench_urls(client, {k: v for k, v in DOCUMENT_URLS.items() if selected(k)}, args.n, ids))
+
+    print_table(results)
+    if args.output:
+        write_results(args.output, run_meta("micro", args, database=engine.dialect.name), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/modes.py
+"""
+Синхронный (Flask, WSGI) и асинхронный (asgi.py, ASGI) режимы под одной
+нагрузкой: оба сервера поднимаются на одной базе (DATABASE_URL), по каждому
+уровню --concurrency выполняется сценарий load.py. Итог — req/s, p95 и
+ошибки по режимам и уровням; --output — JSON для compare.py (случаи
+sync.c<N>, async.c<N>).
+
+Команды серверов задаются шаблонами с {port}; по умолчанию — многопоточный
+сервер Flask и uvicorn с одним процессом, чтобы сравнивать режимы, а не
+число процессов. Для прогона как в продакшене задайте одинаковое число
+воркеров, например:
+  --sync-cmd "gunicorn -w 4 --threads 8 -b 127.0.0.1:{port} app:app"
+  --async-cmd "uvicorn asgi:app --workers 4 --port {port}"
+
+Данные — benchmarks/datagen.py. Запуск из корня проекта:
+  python benchmarks/modes.py [-c 16,64,256] [-d 20]
+"""
+import os
+import sys
+import time
+import shlex
+import socket
+import argparse
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ROOT, print_table, run_meta, write_results  # noqa: E402
+from load import SCENARIO, WRITE_SCENARIO, run_load, add_load_args  # noqa: E402
+
+SERVERS = {
+    "sync": f"{sys.executable} -m flask --app app run --port {{port}} --with-threads",
+    "async": f"{sys.executable} -m uvicorn asgi:app --port {{port}} --log-level warning --no-access-log",
+}
+READY_PATH = "/api/courses?limit=1"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, process, timeout=30):
+    """Ждать, пока сервер ответит 200 на READY_PATH"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", READY_PATH)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} is not ready after {timeout} s")
+
+
+def run_mode(command, args, levels, log=subprocess.DEVNULL):
+    """Поднять сервер командой command и прогнать нагрузку на каждом уровне конкурентности"""
+    port = free_port()
+    process = subprocess.Popen(shlex.split(command.format(port=port)), cwd=ROOT, stdout=log, stderr=log)
+    try:
+        wait_ready(port, process)
+        target = urlsplit(f"http://127.0.0.1:{port}")
+        return {level: run_load(target, args, level)[0]["total"] for level in levels}
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--concurrency", default="16,64,256", help="уровни через запятую")
+    parser.add_argument("--sync-cmd", default=SERVERS["sync"])
+    parser.add_argument("--async-cmd", default=SERVERS["async"])
+    parser.add_argument("--server-log", help="файл для вывода серверов (по умолчанию не сохраняется)")
+    add_load_args(parser)
+    args = parser.parse_args()
+    args.scenario = dict(SCENARIO, **(WRITE_SCENARIO if args.writes else {}))
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    results = {}
+    with open(args.server_log or os.devnull, "ab") as log:
+        for mode, command in (("sync", args.sync_cmd), ("async", args.async_cmd)):
+            for level, res in run_mode(command, args, levels, log).items():
+                results[f"{mode}.c{level}"] = res
+    print_table(results)
+
+    print(f"\n{'connections':>12} {'sync req/s':>12} {'async req/s':>12} {'speedup':>8} {'errors':>10}")
+    for level in levels:
+        sync, async_ = results[f"sync.c{level}"], results[f"async.c{level}"]
+        speedup = async_["rps"] / sync["rps"] if sync["rps"] else float("inf")
+        print(f"{level:12d} {sync['rps']:12.1f} {async_['rps']:12.1f} {speedup:7.2f}x "
+              f"{sync['errors']:>4}/{async_['errors']:<4}")
+    if args.output:
+        del args.scenario
+        write_results(args.output, run_meta("modes", args), results)
+    return 1 if any(res["errors"] for res in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# bulk.py
+"""
+Пакетное создание, изменение и удаление записей об оценках.
+
+Вся пачка проверяется заранее: формат полей — в Python, существование
+студентов, курсов и изменяемых записей — одним SELECT (UNION ALL).
+Запись — одним executemany (INSERT ... RETURNING id / UPDATE по
+первичному ключу / DELETE ... WHERE id IN) в одной транзакции.
+Ошибки возвращаются по индексам элементов; транзакцию
+коммитит вызывающий код (кроме delete_where — удаления по фильтру
+пачками, каждая в своей транзакции).
+"""
+from sqlalchemy import select, insert, update, delete, union_all, literal, bindparam
+from models import Student, Course, Record, parse_date
+from changes import stamp_rows, tombstone
+from versions import bump_versions
+from analytics import track, grade_value, RECORD_STAT_COLUMNS
+
+MAX_BULK_RECORDS = 20000
+DELETE_BATCH_SIZE = 1000  # записей за транзакцию в delete_where
+RECORD_FIELDS = ("id_student", "course_id", "date", "grade")
+GRADE_MAX_LENGTH = 10
+
+
+class BulkError(ValueError):
+    """Тело запроса целиком неверное (не список, слишком длинный и т.п.)"""
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _in_ids(column, ids):
+    # id — целые числа, подставляются прямо в SQL: у SQLite ограничено число параметров
+    return column.in_(bindparam(f"{column.table.name}_bulk_ids", sorted(ids), expanding=True, literal_execute=True))
+
+
+def existing_ids(db, students=(), courses=(), records=()):
+    """Какие из переданных id есть в базе — одним запросом по всем таблицам"""
+    parts = []
+    for tag, column, ids in (("students", Student.id, students), ("courses", Course.id, courses),
+                             ("records", Record.id, records)):
+        if ids:
+            parts.append(select(literal(tag).label("tag"), column.label("id")).where(_in_ids(column, ids)))
+    found = {"students": set(), "courses": set(), "records": set()}
+    if parts:
+        for tag, row_id in db.execute(union_all(*parts)):
+            found[tag].add(row_id)
+    return found
+
+
+def _parse_fields(item, required):
+    """Поля записи из элемента пачки -> (значения для БД, ошибка)"""
+    values = {}
+    for field in RECORD_FIELDS:
+        if field not in item:
+            if field in required:
+                return None, f"{field} is required"
+            continue
+        value = item[field]
+        if field in ("id_student", "course_id"):
+            if not _is_int(value):
+                return None, f"Invalid {field}"
+        elif field == "date":
+            try:
+                value = parse_date(value)
+            except (TypeError, ValueError):
+                return None, "Invalid date"
+        elif value is not None and (not isinstance(value, str) or len(value) > GRADE_MAX_LENGTH):
+            return None, "Invalid grade"
+        values[field] = value
+    return values, None
+
+
+def _check_items(items):
+    if not isinstance(items, list) or not items:
+        raise BulkError("Expected a non-empty list")
+    if len(items) > MAX_BULK_RECORDS:
+        raise BulkError(f"Too many items (max {MAX_BULK_RECORDS})")
+
+
+def _check_refs(rows, errors, found):
+    """Отсеять строки со ссылками на несуществующих студентов/курсы"""
+    valid = []
+    for index, values in rows:
+        if "id_student" in values and values["id_student"] not in found["students"]:
+            errors.append({"index": index, "error": "Student not found"})
+        elif "course_id" in values and values["course_id"] not in found["courses"]:
+            errors.append({"index": index, "error": "Course not found"})
+        else:
+            valid.append((index, values))
+    return valid
+
+
+def validate_create(db, items):
+    """Проверить пачку на создание -> (список (индекс, значения), ошибки)"""
+    _check_items(items)
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        values, error = _parse_fields(item, RECORD_FIELDS[:3]) if isinstance(item, dict) else (None, "Expected an object")
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            values.setdefault("grade", None)
+            rows.append((index, values))
+    found = existing_ids(db, {v["id_student"] for _, v in rows}, {v["course_id"] for _, v in rows})
+    return _check_refs(rows, errors, found), errors
+
+
+def validate_update(db, items):
+    """Проверить пачку на изменение (у каждого элемента есть id) -> (строки, ошибки)"""
+    _check_items(items)
+    rows, errors, seen = [], [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "error": "Expected an object"})
+            continue
+        values, error = _parse_fields(item, ())
+        if error is None and not _is_int(item.get("id")):
+            error = "Invalid id"
+        elif error is None and item["id"] in seen:
+            error = "Duplicate id"
+        elif error is None and not values:
+            error = "Nothing to update"
+        if error:
+            errors.append({"index": index, "error": error})
+            continue
+        seen.add(item["id"])
+        rows.append((index, dict(values, id=item["id"])))
+    found = existing_ids(db, {v["id_student"] for _, v in rows if "id_student" in v},
+                         {v["course_id"] for _, v in rows if "course_id" in v}, seen)
+    missing = [(i, v) for i, v in rows if v["id"] not in found["records"]]
+    errors.extend({"index": i, "error": "Not found"} for i, _ in missing)
+    rows = [(i, v) for i, v in rows if v["id"] in found["records"]]
+    return _check_refs(rows, errors, found), errors
+
+
+def validate_delete(db, ids):
+    """Проверить список id на удаление -> (существующие id, ошибки)"""
+    _check_items(ids)
+    errors = [{"index": i, "error": "Invalid id"} for i, v in enumerate(ids) if not _is_int(v)]
+    wanted = {v for v in ids if _is_int(v)}
+    found = existing_ids(db, records=wanted)["records"]
+    errors.extend({"index": i, "error": "Not found"} for i, v in enumerate(ids) if _is_int(v) and v not in found)
+    errors.sort(key=lambda e: e["index"])
+    return sorted(found), errors
+
+
+def insert_records(db, rows):
+    """INSERT ... RETURNING id для всех строк (многострочные VALUES); id в порядке rows"""
+    if not rows:
+        return []
+    # id из последовательности (rowid в SQLite) выдаются строкам VALUES по порядку,
+    # поэтому отсортированный RETURNING совпадает с порядком rows. sort_by_parameter_order
+    # на SQLite выродился бы в отдельный INSERT на каждую строку.
+    values = stamp_rows(db, [dict(values, grade_value=grade_value(values["grade"])) for _, values in rows])
+    track(db, added=[(v["id_student"], v["course_id"], v["date"], v["grade_value"]) for v in values])
+    return sorted(db.scalars(insert(Record).returning(Record.id), values))
+
+
+def _stat_rows(db, ids):
+    """Статистические колонки записей по id (до изменения/удаления) — одним SELECT"""
+    return {row.id: tuple(row[1:]) for row in db.query(Record.id, *RECORD_STAT_COLUMNS).filter(_in_ids(Record.id, ids))}
+
+
+def update_records(db, rows):
+    """UPDATE по первичному ключу (executemany, строки сгруппированы по набору полей)"""
+    if not rows:
+        return 0
+    values = [dict(v) for _, v in rows]
+    old = _stat_rows(db, [v["id"] for v in values])
+    new = []
+    for v in values:
+        if "grade" in v:
+            v["grade_value"] = grade_value(v["grade"])
+        id_student, course_id, day, value = old[v["id"]]
+        new.append((v.get("id_student", id_student), v.get("course_id", course_id),
+                    v.get("date", day), v.get("grade_value", value)))
+    track(db, added=new, removed=list(old.values()))
+    db.execute(update(Record), stamp_rows(db, values))
+    return len(rows)
+
+
+def delete_records(db, ids):
+    if not ids:
+        return 0
+    tombstone(db, "records", ids)
+    track(db, removed=list(_stat_rows(db, ids).values()))
+    return db.execute(delete(Record).where(_in_ids(Record.id, ids)), execution_options={"synchronize_session": False}).rowcount
+
+
+def delete_where(db, conditions, batch_size=DELETE_BATCH_SIZE):
+    """
+    Удалить записи, подходящие под conditions, пачками по batch_size: каждая
+    пачка (надгробия, статистика, DELETE по id) коммитится сразу, так что
+    блокировки держатся недолго. Генератор — отдаёт число удалённых в пачке.
+    """
+    last_id = 0
+    while True:
+        ids = db.scalars(select(Record.id).where(*conditions, Record.id > last_id)
+                         .order_by(Record.id).limit(batch_size)).all()
+        if not ids:
+            return
+        count = delete_records(db, ids)
+        bump_versions(db, "records")
+        db.commit()
+        last_id = ids[-1]
+        yield count
@@ -0,0 +1,138 @@
+# changes.py
+"""
+Отслеживание изменений для инкрементальной синхронизации (GET /api/changes).
+
+Общий счётчик ревизий хранится в table_versions (строка REVISION_KEY).
+Каждая созданная или изменённая строка students/courses/records получает
+в колонку revision следующий номер, удалённая — запись в tombstones.
+Счётчик увеличивается UPDATE-ом в транзакции изменения: строка счётчика
+заблокирована до commit, поэтому ревизии становятся видны по порядку и
+клиент, запомнивший номер, не пропустит более раннюю запись.
+
+Выборка изменений идёт по индексам на revision, так что её стоимость
+зависит от числа изменений, а не от размера таблиц.
+"""
+from sqlalchemy import update, insert, select, literal
+from models import Student, Course, Record, Tombstone, TableVersion
+
+REVISION_KEY = "__revision__"
+DEFAULT_CHANGES_LIMIT = 1000
+MAX_CHANGES_LIMIT = 10000
+
+# Записи в ленте изменений — без ФИО студента и названия курса: переименование
+# ставит ревизию только самому студенту/курсу, имена клиент берёт из их копий
+RECORD_CHANGE_COLUMNS = (Record.id, Record.id_student, Record.course_id, Record.date, Record.grade)
+
+
+def record_change_to_dict(row):
+    return {
+        "id": row.id,
+        "id_student": row.id_student,
+        "course_id": row.course_id,
+        "date": row.date.isoformat() if row.date else None,
+        "grade": row.grade
+    }
+
+
+# таблица -> (модель, колонки выборки, сериализация)
+CHANGE_SOURCES = {
+    "students": (Student, (Student,), lambda row: row[0].to_dict()),
+    "courses": (Course, (Course,), lambda row: row[0].to_dict()),
+    "records": (Record, RECORD_CHANGE_COLUMNS, record_change_to_dict),
+}
+
+
+def next_revisions(db, count=1):
+    """Зарезервировать count ревизий подряд; возвращает первую"""
+    result = db.execute(update(TableVersion).where(TableVersion.table_name == REVISION_KEY)
+                        .values(version=TableVersion.version + count).returning(TableVersion.version))
+    last = result.scalar()
+    if last is None:
+        # строки нет (база создана через create_all, а не миграциями)
+        last = count
+        db.add(TableVersion(table_name=REVISION_KEY, version=last))
+        db.flush()
+    return last - count + 1
+
+
+def current_revision(db):
+    value = db.query(TableVersion.version).filter(TableVersion.table_name == REVISION_KEY).scalar()
+    return value or 0
+
+
+def stamp(db, obj):
+    """Отметить созданную или изменённую строку новой ревизией"""
+    obj.revision = next_revisions(db)
+
+
+def stamp_rows(db, rows):
+    """Проставить revision словарям строк пакетной вставки/изменения (по ревизии на строку)"""
+    if rows:
+        first = next_revisions(db, len(rows))
+        for offset, values in enumerate(rows):
+            values["revision"] = first + offset
+    return rows
+
+
+def tombstone(db, table, ids):
+    """Запомнить удаление строк table с указанными id"""
+    ids = list(ids)
+    if ids:
+        first = next_revisions(db, len(ids))
+        db.execute(insert(Tombstone), [{"table_name": table, "row_id": row_id, "revision": first + offset}
+                                       for offset, row_id in enumerate(ids)])
+
+
+def tombstone_where(db, table, condition):
+    """
+    Надгробия для всех строк table, подходящих под condition (каскадное удаление
+    записей студента/курса) — одним INSERT ... SELECT с общей ревизией.
+    """
+    model = CHANGE_SOURCES[table][0]
+    revision = next_revisions(db)
+    db.execute(insert(Tombstone).from_select(
+        ["table_name", "row_id", "revision"],
+        select(literal(table), model.id, literal(revision)).where(condition)))
+
+
+def _window(query, column, since, until, limit):
+    """Строки с since < revision <= until, не больше limit (+1 для проверки продолжения)"""
+    return query.filter(column > since, column <= until).order_by(column).limit(limit + 1).all()
+
+
+def collect_changes(db, since, tables, limit=DEFAULT_CHANGES_LIMIT):
+    """
+    Изменения после ревизии since: {"revision", "has_more", "reset", <таблица>: [...], "deleted": {...}}.
+    Если в каком-то источнике больше limit строк, ответ обрезается по ревизии
+    так, чтобы следующий запрос с since=revision продолжил без пропусков.
+    Клиент применяет сначала deleted, затем изменённые строки: строка, которая
+    есть в обоих списках, была создана заново после удаления.
+    """
+    until = current_revision(db)
+    reset = since > until  # база восстановлена из копии — клиенту нужен полный снимок
+    if reset:
+        since = 0
+    sources = []  # (запрос, колонка ревизии): изменённые строки и надгробия каждой таблицы
+    for table in tables:
+        model, columns = CHANGE_SOURCES[table][:2]
+        changed = db.query(*columns, model.revision.label("revision")).select_from(model)
+        sources.append((changed, model.revision))
+        sources.append((db.query(Tombstone.row_id, Tombstone.revision).filter(Tombstone.table_name == table),
+                        Tombstone.revision))
+
+    fetched = [_window(query, column, since, until, limit) for query, column in sources]
+    truncated = [rows for rows in fetched if len(rows) > limit]
+    cut = min([until] + [rows[limit].revision - 1 for rows in truncated])
+    if truncated and cut <= since:
+        # больше limit строк с одной ревизией (каскадное удаление) — отдаём их целиком
+        cut = min(rows[limit].revision for rows in truncated)
+        fetched = [query.filter(column > since, column <= cut).order_by(column).all()
+                   for query, column in sources]
+
+    result = {"revision": cut, "has_more": cut < until, "reset": reset, "deleted": {}}
+    for index, table in enumerate(tables):
+        serialize = CHANGE_SOURCES[table][2]
+        changed, deleted = fetched[2 * index], fetched[2 * index + 1]
+        result[table] = [serialize(row) for row in changed if row.revision <= cut]
+        result["deleted"][table] = [row.row_id for row in deleted if row.revision <= cut]
+    return result
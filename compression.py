@@ -0,0 +1,51 @@
+# compression.py
+"""
+Сжатие ответов JSON API (gzip, brotli — если установлен пакет Brotli).
+
+Кодировка выбирается по Accept-Encoding; ответы меньше COMPRESS_MIN_SIZE
+и потоковые ответы (NDJSON) отдаются как есть. Строгий ETag сжатого
+ответа получает суффикс кодировки — у разных представлений разные ETag.
+"""
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # байт
+COMPRESS_MIMETYPES = {"application/json"}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # выше — заметно медленнее на больших списках
+
+ENCODING_SUFFIXES = ("gzip", "br")
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate_encoding(req=None):
+    """Лучшая кодировка из поддерживаемых по Accept-Encoding или None"""
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return (request if req is None else req).accept_encodings.best_match(supported)
+
+
+def compress_response(response, req=None):
+    """after_request: сжать ответ, если клиент это поддерживает и ответ достаточно большой"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(req)
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(_compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
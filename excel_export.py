@@ -0,0 +1,138 @@
+# excel_export.py
+"""
+Потоковая выгрузка журнала успеваемости в Excel.
+
+Книга строится в write-only режиме openpyxl: строки сразу уходят в XML
+листа и не держатся в памяти, записи читаются из БД пачками (yield_per).
+Ширина колонок в write-only режиме пишется до строк, поэтому она
+считается заранее одним агрегатным запросом по длинам значений.
+"""
+from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+from sqlalchemy import select, func
+from models import Student, Course, Record
+
+EXPORT_BATCH_SIZE = 2000
+
+JOURNAL_SHEET = "Журнал успеваемости"
+JOURNAL_TITLE = "ЖУРНАЛ УСПЕВАЕМОСТИ"
+JOURNAL_HEADERS = ["ID", "ФИО студента", "Дата рождения", "Телефон", "Курс", "Оценка", "Дата"]
+NO_GRADE = "Не оценено"
+DATE_FORMAT = "%d.%m.%Y"
+MIN_COLUMN_WIDTH = 15
+
+
+def journal_query():
+    """Строки журнала: запись + студент + курс, LEFT JOIN как раньше у joinedload"""
+    return (
+        select(Record.id, Student.fio, Student.date_of_birth, Student.phone,
+               Course.name, Record.grade, Record.date)
+        .select_from(Record)
+        .outerjoin(Record.student)
+        .outerjoin(Record.course)
+        .order_by(Record.id)
+    )
+
+
+def journal_row(row):
+    return [
+        row.id,
+        row.fio or "",
+        row.date_of_birth.strftime(DATE_FORMAT) if row.date_of_birth else "",
+        row.phone or "",
+        row.name or "",
+        row.grade or NO_GRADE,
+        row.date.strftime(DATE_FORMAT) if row.date else "",
+    ]
+
+
+def journal_column_widths(db):
+    """Автоширина колонок по максимальной длине значения (заголовки, название журнала и данные)"""
+    date_len = len(datetime.now().strftime(DATE_FORMAT))
+    stats = db.execute(
+        select(
+            func.max(Record.id),
+            func.max(func.length(Student.fio)),
+            func.count(Student.date_of_birth),
+            func.max(func.length(Student.phone)),
+            func.max(func.length(Course.name)),
+            func.max(func.length(func.coalesce(func.nullif(Record.grade, ""), NO_GRADE))),
+            func.count(Record.date),
+        )
+        .select_from(Record)
+        .outerjoin(Record.student)
+        .outerjoin(Record.course)
+    ).one()
+    max_id, fio, dob_count, phone, course, grade, date_count = stats
+    data = [
+        len(str(max_id)) if max_id is not None else 0,
+        fio or 0,
+        date_len if dob_count else 0,
+        phone or 0,
+        course or 0,
+        grade or 0,
+        date_len if date_count else 0,
+    ]
+    widths = []
+    for i, header in enumerate(JOURNAL_HEADERS):
+        longest = max(len(header), data[i])
+        if i == 0:
+            longest = max(longest, len(JOURNAL_TITLE))
+        widths.append(max(MIN_COLUMN_WIDTH, longest + 2))
+    return widths
+
+
+def _styled(ws, value, **style):
+    cell = WriteOnlyCell(ws, value=value)
+    for name, val in style.items():
+        setattr(cell, name, val)
+    return cell
+
+
+def write_journal(db, fh):
+    """Записать журнал успеваемости в файл/файловый объект fh"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(JOURNAL_SHEET)
+
+    for i, width in enumerate(journal_column_widths(db), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    # --- Заголовок ---
+    ws.merged_cells.add(f"A1:{get_column_letter(len(JOURNAL_HEADERS))}1")
+    ws.append([_styled(
+        ws, JOURNAL_TITLE,
+        font=Font(size=16, bold=True, color="1F4E78"),
+        alignment=Alignment(horizontal="center", vertical="center"),
+        fill=PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid"),
+    )])
+
+    # --- Шапка таблицы ---
+    header_fill = PatternFill(start_color="305496", end_color="305496", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    thin = Side(border_style="thin", color="000000")
+    ws.append([
+        _styled(ws, header, font=header_font, fill=header_fill,
+                alignment=Alignment(horizontal="center", vertical="center"),
+                border=Border(top=thin, left=thin, right=thin, bottom=thin))
+        for header in JOURNAL_HEADERS
+    ])
+
+    # --- Данные ---
+    rows = db.execute(journal_query().execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in rows:
+        ws.append(journal_row(row))
+
+    # --- Подпись и дата ---
+    bold = Font(bold=True)
+    ws.append([])
+    ws.append([])
+    ws.append([
+        _styled(ws, "Подпись преподавателя:", font=bold), "", "", "",
+        _styled(ws, "Дата:", font=bold), datetime.now().strftime(DATE_FORMAT),
+    ])
+
+    wb.save(fh)
+    return fh
@@ -0,0 +1,249 @@
+# importer.py
+"""
+Импорт студентов, курсов и записей из CSV или XLSX.
+
+Файл читается потоково (csv / openpyxl в режиме read_only), строки
+проверяются и приводятся к типам так же, как в API (parse_date), и
+загружаются пачками по IMPORT_CHUNK_SIZE: в PostgreSQL через COPY,
+в остальных СУБД — многострочным INSERT. Каждая пачка коммитится
+отдельно, поэтому память не зависит от размера файла, а прогресс
+виден по мере загрузки. Ошибки — по номерам строк файла (заголовок — 1).
+
+Запуск: python importer.py <students|courses|records> <файл> [--format csv|xlsx] [--chunk-size N]
+"""
+import io
+import os
+import csv
+import sys
+import argparse
+from sqlalchemy import insert
+from models import Student, Course, Record, parse_date
+from bulk import existing_ids
+from versions import bump_versions
+from changes import next_revisions
+from analytics import track, grade_value
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000  # остальные ошибки только считаются
+IMPORT_FORMATS = ("csv", "xlsx")
+
+# таблица -> (модель, колонки: (имя, обязательная, тип))
+IMPORT_COLUMNS = {
+    "students": (Student, (("fio", True, "text"), ("date_of_birth", True, "date"), ("phone", False, "text"))),
+    "courses": (Course, (("name", True, "text"), ("description", False, "text"), ("teacher", False, "text"))),
+    "records": (Record, (("id_student", True, "int"), ("course_id", True, "int"),
+                         ("date", True, "date"), ("grade", False, "text"))),
+}
+
+
+class ImportFileError(ValueError):
+    """Файл нельзя импортировать: неизвестный формат или таблица, нет обязательных колонок"""
+
+
+def detect_format(filename, explicit=None):
+    fmt = (explicit or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    if fmt not in IMPORT_FORMATS:
+        raise ImportFileError("Unknown file format, expected csv or xlsx")
+    return fmt
+
+
+# --- чтение файла ---
+def _csv_rows(fh):
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    header_line = text.readline()
+    # Excel с русской локалью сохраняет CSV через «;»
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = next(csv.reader([header_line], delimiter=delimiter), [])
+    reader = csv.reader(text, delimiter=delimiter)
+
+    def rows():
+        for values in reader:
+            yield reader.line_num + 1, values
+    return header, rows()
+
+
+def _xlsx_rows(fh):
+    from openpyxl import load_workbook
+    workbook = load_workbook(fh, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, ())
+
+    def numbered():
+        try:
+            for number, values in enumerate(rows, start=2):
+                yield number, values
+        finally:
+            workbook.close()
+    return header, numbered()
+
+
+def open_rows(fh, fmt):
+    """(заголовок, итератор (номер строки, значения)) для двоичного файла fh"""
+    return _csv_rows(fh) if fmt == "csv" else _xlsx_rows(fh)
+
+
+# --- проверка и приведение типов ---
+def _convert(value, kind, length):
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == "":
+        return None
+    if kind == "int":
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, bool):
+            raise ValueError
+        return int(value)
+    if kind == "date":
+        return parse_date(value)
+    value = str(value)
+    if length and len(value) > length:
+        raise ValueError
+    return value
+
+
+def _row_reader(table, header):
+    """Функция: значения строки файла -> (кортеж для загрузки, ошибка)"""
+    model, columns = IMPORT_COLUMNS[table]
+    names = [str(h).strip().lower() if h is not None else "" for h in header]
+    positions = []
+    for name, required, kind in columns:
+        if name in names:
+            positions.append(names.index(name))
+        elif required:
+            raise ImportFileError(f"Missing column: {name}")
+        else:
+            positions.append(None)
+    specs = [(name, required, kind, model.__table__.c[name].type.length if kind == "text" else None, pos)
+             for (name, required, kind), pos in zip(columns, positions)]
+
+    def read(values):
+        row = []
+        for name, required, kind, length, pos in specs:
+            raw = values[pos] if pos is not None and pos < len(values) else None
+            try:
+                value = _convert(raw, kind, length)
+            except (TypeError, ValueError):
+                return None, f"Invalid {name}"
+            if value is None and required:
+                return None, f"{name} is required"
+            row.append(value)
+        return tuple(row), None
+    return read
+
+
+# --- загрузка ---
+def _copy(db, table, columns, rows):
+    # psycopg 3: COPY в той же транзакции, что и сессия
+    conn = db.connection().connection.driver_connection
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def _insert(db, table, columns, rows):
+    model = IMPORT_COLUMNS[table][0]
+    db.execute(insert(model), [dict(zip(columns, row)) for row in rows])
+
+
+def load_chunk(db, table, rows):
+    """Загрузить проверенные строки одной пачкой (без commit)"""
+    columns = [c[0] for c in IMPORT_COLUMNS[table][1]] + ["revision"]
+    first = next_revisions(db, len(rows))
+    rows = [row + (first + offset,) for offset, row in enumerate(rows)]
+    if table == "records":
+        # (id_student, course_id, date, grade, revision) + числовая оценка
+        columns.append("grade_value")
+        rows = [row + (grade_value(row[3]),) for row in rows]
+        track(db, added=[(row[0], row[1], row[2], row[-1]) for row in rows])
+    if db.get_bind().dialect.name == "postgresql":
+        _copy(db, table, columns, rows)
+    else:
+        _insert(db, table, columns, rows)
+
+
+def import_rows(db, table, fh, fmt, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Проверить таблицу и заголовок файла (ImportFileError сразу) и вернуть
+    генератор, который загружает файл и после каждой пачки отдаёт сводку
+    {"rows", "inserted", "error_count", "errors", "done"}.
+    """
+    if table not in IMPORT_COLUMNS:
+        raise ImportFileError(f"Unknown table: {table}")
+    header, numbered = open_rows(fh, fmt)
+    return _load(db, table, numbered, _row_reader(table, header), chunk_size)
+
+
+def _load(db, table, numbered, read, chunk_size):
+    summary = {"rows": 0, "inserted": 0, "error_count": 0, "errors": [], "done": False}
+
+    def error(number, message):
+        summary["error_count"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"row": number, "error": message})
+
+    def flush(chunk):
+        if table == "records":
+            found = existing_ids(db, {r[0] for _, r in chunk}, {r[1] for _, r in chunk})
+            valid = []
+            for number, row in chunk:
+                if row[0] not in found["students"]:
+                    error(number, "Student not found")
+                elif row[1] not in found["courses"]:
+                    error(number, "Course not found")
+                else:
+                    valid.append((number, row))
+            chunk = valid
+        if chunk:
+            load_chunk(db, table, [row for _, row in chunk])
+            bump_versions(db, table)
+            db.commit()
+            summary["inserted"] += len(chunk)
+
+    chunk = []
+    for number, values in numbered:
+        if not any(v not in (None, "") for v in values):
+            continue  # пустые строки (часто в конце листа XLSX)
+        summary["rows"] += 1
+        row, message = read(values)
+        if message:
+            error(number, message)
+            continue
+        chunk.append((number, row))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+            yield dict(summary)
+    flush(chunk)
+    summary["done"] = True
+    yield summary
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("table", choices=sorted(IMPORT_COLUMNS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv[1:])
+
+    from models import SessionLocal
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as fh:
+            for summary in import_rows(db, args.table, fh, detect_format(args.path, args.format), args.chunk_size):
+                print(f"rows: {summary['rows']}  inserted: {summary['inserted']}  errors: {summary['error_count']}",
+                      file=sys.stderr)
+    except ImportFileError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+    for item in summary["errors"]:
+        print(f"row {item['row']}: {item['error']}")
+    return 1 if summary["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
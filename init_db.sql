@@ -15,8 +15,72 @@ CREATE TABLE IF NOT EXISTS courses (
 
 CREATE TABLE IF NOT EXISTS records (
     id SERIAL PRIMARY KEY,
-    id_student INT NOT NULL REFERENCES students(id) ,
-    course_id INT NOT NULL REFERENCES courses(id) ,
+    id_student INT NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    course_id INT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
     date DATE NOT NULL,
     grade VARCHAR(10) -- '5','4','3','2' or 'Не оценено'
 );
+
+-- Индексы для списков, фильтров и каскадного удаления (migrations.py, версия 2)
+CREATE INDEX IF NOT EXISTS ix_records_course_date ON records (course_id, date, id);
+CREATE INDEX IF NOT EXISTS ix_records_student_date ON records (id_student, date);
+CREATE INDEX IF NOT EXISTS ix_records_date_id ON records (date, id);
+CREATE INDEX IF NOT EXISTS ix_students_dob_id ON students (date_of_birth, id);
+CREATE INDEX IF NOT EXISTS ix_courses_teacher ON courses (teacher);
+
+-- Поиск по подстроке (search.py): GIN-индексы pg_trgm для ILIKE '%q%'
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_students_fio_trgm ON students USING gin (fio gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_courses_name_trgm ON courses USING gin (name gin_trgm_ops);
+
+-- Версии таблиц для ETag (versions.py, migrations.py версия 4)
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version INT NOT NULL
+);
+INSERT INTO table_versions (table_name, version)
+VALUES ('students', 0), ('courses', 0), ('records', 0)
+ON CONFLICT (table_name) DO NOTHING;
+
+-- Ревизии и надгробия для GET /api/changes (changes.py, migrations.py версия 5)
+ALTER TABLE students ADD COLUMN IF NOT EXISTS revision INT NOT NULL DEFAULT 0;
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS revision INT NOT NULL DEFAULT 0;
+ALTER TABLE records ADD COLUMN IF NOT EXISTS revision INT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS ix_students_revision ON students (revision);
+CREATE INDEX IF NOT EXISTS ix_courses_revision ON courses (revision);
+CREATE INDEX IF NOT EXISTS ix_records_revision ON records (revision);
+CREATE TABLE IF NOT EXISTS tombstones (
+    id SERIAL PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    row_id INT NOT NULL,
+    revision INT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_tombstones_table_revision ON tombstones (table_name, revision);
+INSERT INTO table_versions (table_name, version) VALUES ('__revision__', 1)
+ON CONFLICT (table_name) DO NOTHING;
+
+-- Числовая оценка и агрегаты статистики (analytics.py, migrations.py версия 6);
+-- после загрузки данных этим скриптом выполните: python analytics.py rebuild
+ALTER TABLE records ADD COLUMN IF NOT EXISTS grade_value SMALLINT;
+UPDATE records SET grade_value = CASE TRIM(grade)
+    WHEN '5' THEN 5 WHEN '4' THEN 4 WHEN '3' THEN 3 WHEN '2' THEN 2 END;
+CREATE TABLE IF NOT EXISTS grade_aggregates (
+    scope VARCHAR(16) NOT NULL,
+    scope_id INT NOT NULL,
+    month DATE NOT NULL,
+    total INT NOT NULL,
+    grade_2 INT NOT NULL,
+    grade_3 INT NOT NULL,
+    grade_4 INT NOT NULL,
+    grade_5 INT NOT NULL,
+    ungraded INT NOT NULL,
+    grade_sum INT NOT NULL,
+    PRIMARY KEY (scope, scope_id, month)
+);
+
+-- Каскадное удаление записей студента/курса в БД (migrations.py, версия 7)
+-- для баз, созданных прежней версией этого скрипта
+ALTER TABLE records DROP CONSTRAINT IF EXISTS records_id_student_fkey,
+    ADD CONSTRAINT records_id_student_fkey FOREIGN KEY (id_student) REFERENCES students(id) ON DELETE CASCADE;
+ALTER TABLE records DROP CONSTRAINT IF EXISTS records_course_id_fkey,
+    ADD CONSTRAINT records_course_id_fkey FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE;
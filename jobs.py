@@ -0,0 +1,269 @@
+# jobs.py
+"""
+Фоновая генерация отчётов (Excel / Word / PDF).
+
+Запрос ставит задание в очередь и сразу получает id; рендеринг идёт в
+отдельном пуле процессов, так что тяжёлые openpyxl и reportlab не занимают
+веб-воркеры. Результаты и статусы лежат на диске (их видят все воркеры)
+и удаляются по истечении TTL. Одинаковые задания, которые ещё не
+завершены, не дублируются — возвращается id уже поставленного.
+
+Дедупликация и лимит незавершённых заданий (max_pending) общие для всех
+веб-воркеров: ключ задания занимается файлом <ключ>.key в каталоге
+заданий (создание атомарно), незавершённые задания считаются по
+метаданным на диске. Лимит проверяется без общей блокировки, поэтому при
+одновременной постановке может быть превышен на число воркеров. Пул
+рендеринга (max_workers процессов) — свой у каждого веб-воркера.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import collections
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Тип отчёта -> (расширение файла, MIME-тип)
+REPORT_KINDS = {
+    "excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "word": (".docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "pdf": (".pdf", "application/pdf"),
+}
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Слишком много незавершённых заданий"""
+
+
+def run_report(kind, params, out_path):
+    """Выполняется в процессе пула: сформировать отчёт и записать его в out_path"""
+    if kind == "excel":
+        from models import SessionLocal
+        from replicas import reading
+        from excel_export import write_journal
+        db = SessionLocal()
+        try:
+            with reading(), open(out_path + ".part", "wb") as fh:
+                write_journal(db, fh)
+        finally:
+            SessionLocal.remove()  # следующее задание процесса заново выберет реплику
+    else:
+        if kind == "word":
+            from word_export import render_application as render
+        else:
+            from pdf_export import render_consent as render
+        with open(out_path + ".part", "wb") as fh:
+            fh.write(render(params["fio"], params.get("phone")))
+    os.replace(out_path + ".part", out_path)
+    return out_path
+
+
+def warm_worker():
+    """Инициализатор процесса пула: ресурсы документов загружаются один раз"""
+    import resources
+    import word_export
+    resources.warm()
+    word_export.warm()
+
+
+def default_executor(max_workers):
+    # spawn: воркеры не наследуют потоки и соединения веб-процесса
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=warm_worker)
+
+
+def ordered_map(executor, fn, items, ahead):
+    """
+    Как executor.map, но в работе не больше ahead задач одновременно:
+    результаты идут по порядку, а память не растёт с числом элементов.
+    """
+    pending = collections.deque()
+    try:
+        for args in items:
+            pending.append(executor.submit(fn, *args))
+            if len(pending) >= ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class ReportQueue:
+    def __init__(self, root, max_workers=2, max_pending=20, ttl=3600, executor=None):
+        self.root = root
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = executor
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = default_executor(self.max_workers)
+        return self._executor
+
+    # --- хранилище на диске ---
+    def _meta_path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def _key_path(self, key):
+        return os.path.join(self.root, f"{key}.key")
+
+    def result_path(self, job_id, kind):
+        return os.path.join(self.root, job_id + REPORT_KINDS[kind][0])
+
+    def _write_meta(self, job):
+        tmp = self._meta_path(job["id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(job, fh, ensure_ascii=False)
+        os.replace(tmp, self._meta_path(job["id"]))
+
+    def get(self, job_id):
+        """Статус задания или None; просроченные задания считаются удалёнными"""
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._meta_path(job_id), encoding="utf-8") as fh:
+                job = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if time.time() - job["created"] > self.ttl:
+            self._remove(job)
+            return None
+        # воркер пишет результат в .part — значит, задание уже выполняется
+        if job["status"] == STATUS_QUEUED and os.path.exists(self.result_path(job_id, job["kind"]) + ".part"):
+            job["status"] = STATUS_RUNNING
+        return job
+
+    def _remove(self, job):
+        result = self.result_path(job["id"], job["kind"])
+        for path in (self._meta_path(job["id"]), result, result + ".part"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict_expired(self):
+        """Удалить задания и файлы старше TTL; возвращает число удалённых"""
+        removed = 0
+        for name in os.listdir(self.root):
+            if name.endswith(".json") and self.get(name[:-5]) is None:
+                removed += 1
+        return removed
+
+    def pending(self):
+        """Число незавершённых заданий всех воркеров (по метаданным на диске)"""
+        jobs = (self.get(name[:-5]) for name in os.listdir(self.root) if name.endswith(".json"))
+        return sum(1 for job in jobs if job and job["status"] in (STATUS_QUEUED, STATUS_RUNNING))
+
+    # --- ключи незавершённых заданий (общие для воркеров) ---
+    def _claim(self, key, job_id):
+        """
+        Занять ключ задания для job_id. Возвращает None, если ключ занят нами,
+        иначе id задания, которое его держит ("" — ключ только что освободили).
+        """
+        path = self._key_path(key)
+        tmp = f"{path}.{job_id}.tmp"
+        with open(tmp, "w", encoding="ascii") as fh:
+            fh.write(job_id)
+        try:
+            os.link(tmp, path)  # атомарно, как O_CREAT | O_EXCL, но файл сразу с id
+            return None
+        except FileExistsError:
+            try:
+                with open(path, encoding="ascii") as fh:
+                    return fh.read().strip()
+            except FileNotFoundError:
+                return ""
+        finally:
+            os.remove(tmp)
+
+    def _release(self, key, job_id):
+        """Освободить ключ, если его всё ещё держит job_id"""
+        path = self._key_path(key)
+        try:
+            with open(path, encoding="ascii") as fh:
+                if fh.read().strip() == job_id:
+                    os.remove(path)
+        except OSError:
+            pass
+
+    # --- постановка в очередь ---
+    @staticmethod
+    def job_key(kind, params):
+        raw = json.dumps([kind, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def submit(self, kind, params, filename):
+        """Поставить отчёт в очередь; возвращает (задание, создано_ли_новое)"""
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Unknown report kind: {kind}")
+        key = self.job_key(kind, params)
+        self.evict_expired()
+        job_id = uuid.uuid4().hex
+        while True:
+            owner = self._claim(key, job_id)
+            if owner is None:
+                break
+            job = self.get(owner) if owner else None
+            if job and job["status"] in (STATUS_QUEUED, STATUS_RUNNING):
+                return job, False
+            self._release(key, owner)  # задание завершилось или пропало (сбой воркера) — ключ устарел
+        if self.pending() >= self.max_pending:
+            self._release(key, job_id)
+            raise QueueFull()
+
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": STATUS_QUEUED,
+            "filename": filename,
+            "created": time.time(),
+            "finished": None,
+            "error": None,
+        }
+        self._write_meta(job)
+
+        future = self.executor.submit(run_report, kind, params, self.result_path(job["id"], kind))
+        future.add_done_callback(lambda f: self._finish(key, job, f))
+        return job, True
+
+    def _finish(self, key, job, future):
+        error = future.exception()
+        job = dict(job, finished=time.time())
+        if error is None:
+            job["status"] = STATUS_DONE
+        else:
+            job["status"] = STATUS_FAILED
+            job["error"] = str(error)
+        self._write_meta(job)
+        self._release(key, job["id"])
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Общая очередь процесса, создаётся при первом обращении"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            from config import REPORT_JOBS_DIR, REPORT_WORKERS, REPORT_MAX_PENDING, REPORT_TTL
+            _queue = ReportQueue(REPORT_JOBS_DIR, REPORT_WORKERS, REPORT_MAX_PENDING, REPORT_TTL)
+        return _queue
+
+
+def get_render_pool():
+    """Пул процессов для рендеринга документов (общий с очередью отчётов)"""
+    return get_queue().executor
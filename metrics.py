@@ -0,0 +1,328 @@
+# metrics.py
+"""
+Метрики запросов в формате Prometheus (GET /metrics) и профиль одного запроса.
+
+Хуки Flask меряют каждый запрос: длительность по эндпоинтам, размер ответа
+(после сжатия), число и время SQL-запросов (события before/after_cursor_execute
+движка), выбранные (или изменённые) строки и ORM-объекты, созданные из строк.
+Время внутри запроса раскладывается по фазам: sql, render (openpyxl, reportlab,
+python-docx — участки под timed("render")), serialize (кодирование JSON).
+Пул соединений: ожидание выдачи, тайм-ауты, занятость (pooling.py), сессии,
+которые обработчик оставил открытыми до конца запроса (api.remove_session),
+и состояние реплик чтения (replicas.py).
+
+Заголовок X-Profile: 1 (при METRICS_PROFILE=1) вместо тела ответа возвращает
+отчёт cProfile по этому запросу: сводку по фазам и функции по cumulative.
+"""
+import io
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from flask import Response, g, request, current_app, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import Base, engine, replica_set
+from pooling import wait_stats, pool_status, WAIT_BUCKETS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PROFILE_LIMIT = 40  # строк функций в отчёте X-Profile
+NO_ENDPOINT = "-"   # SQL вне запроса (фоновые задания, CLI) и неизвестные пути
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами, по одной серии на набор меток"""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self.series = {}  # метки -> [счётчики корзин..., +Inf], сумма
+
+    def observe(self, values, amount):
+        counts, total = self.series.get(values) or ([0] * (len(self.buckets) + 1), 0)
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self.series[values] = (counts, total + amount)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self.series.items()):
+            lines += _series_lines(self.name, self.labels, values, self.buckets, counts, total)
+        return lines
+
+
+def _series_lines(name, labels, values, buckets, counts, total):
+    lines = [f"{name}_bucket{_labels(labels, values, le=bound)} {count}"
+             for bound, count in zip([*map(str, buckets), "+Inf"], counts)]
+    lines.append(f"{name}_sum{_labels(labels, values)} {total:.6f}")
+    lines.append(f"{name}_count{_labels(labels, values)} {counts[-1]}")
+    return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.series = {}
+
+    def inc(self, values, amount=1):
+        self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, values)} {value}" for values, value in sorted(self.series.items())]
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+_lock = threading.Lock()
+REQUESTS = Counter("http_requests_total", "HTTP requests", ("endpoint", "method", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "Request latency", ("endpoint", "method"), LATENCY_BUCKETS)
+RESPONSE_BYTES = Histogram("http_response_bytes", "Response body size (after compression)", ("endpoint",), BYTES_BUCKETS)
+SQL_STATEMENTS = Counter("db_statements_total", "SQL statements executed", ("endpoint",))
+SQL_LATENCY = Histogram("db_statement_duration_seconds", "SQL statement duration", ("endpoint",), LATENCY_BUCKETS)
+SQL_ROWS = Counter("db_rows_total", "Rows fetched, or affected by statements without a result set", ("endpoint",))
+ORM_OBJECTS = Counter("orm_objects_loaded_total", "ORM objects hydrated from rows", ("endpoint",))
+PHASES = Histogram("app_phase_duration_seconds", "Time per request spent in a phase", ("endpoint", "phase"), LATENCY_BUCKETS)
+LEAKED_SESSIONS = Counter("db_sessions_leaked_total", "DB sessions still open at request teardown",
+                          ("endpoint", "reason"))
+METRICS = (REQUESTS, LATENCY, RESPONSE_BYTES, SQL_STATEMENTS, SQL_LATENCY, SQL_ROWS, ORM_OBJECTS, PHASES,
+           LEAKED_SESSIONS)
+
+
+def _pool_lines():
+    """Пул соединений основного движка (pooling.py): ожидание выдачи и занятость"""
+    counts, total, timeouts = wait_stats.snapshot()
+    name = "db_pool_checkout_wait_seconds"
+    lines = [f"# HELP {name} Time waiting for a pooled connection", f"# TYPE {name} histogram"]
+    lines += _series_lines(name, (), (), WAIT_BUCKETS, counts, total)
+    lines += ["# HELP db_pool_checkout_timeouts_total Pool checkouts that timed out",
+              "# TYPE db_pool_checkout_timeouts_total counter", f"db_pool_checkout_timeouts_total {timeouts}"]
+    status = pool_status(engine)
+    if status:
+        lines += ["# HELP db_pool_connections Connections in the pool by state", "# TYPE db_pool_connections gauge"]
+        lines += [f'db_pool_connections{{state="{state}"}} {value}' for state, value in status.items()]
+    if len(replica_set):
+        replicas = replica_set.status()
+        lines += ["# HELP db_replica_up Replica passed its last health check", "# TYPE db_replica_up gauge"]
+        lines += [f'db_replica_up{{replica="{r["replica"]}"}} {int(r["up"])}' for r in replicas]
+        lines += ["# HELP db_replica_reads_total Sessions routed to the replica", "# TYPE db_replica_reads_total counter"]
+        lines += [f'db_replica_reads_total{{replica="{r["replica"]}"}} {r["reads"]}' for r in replicas]
+        lines += ["# HELP db_replica_fallbacks_total Reads sent to the primary because no replica was up",
+                  "# TYPE db_replica_fallbacks_total counter", f"db_replica_fallbacks_total {replica_set.fallbacks}"]
+    return lines
+
+
+def render_metrics():
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.render()]
+    return "\n".join(lines + _pool_lines()) + "\n"
+
+
+def reset_metrics():
+    with _lock:
+        for metric in METRICS:
+            metric.series.clear()
+    wait_stats.reset()
+
+
+def count_leaked_session(endpoint, failed):
+    with _lock:
+        LEAKED_SESSIONS.inc((endpoint or NO_ENDPOINT, "error" if failed else "open"))
+
+
+def observe_request(endpoint, method, status, elapsed, size=None):
+    """Учесть обработанный запрос (Flask или асинхронный режим, asgi.py)"""
+    with _lock:
+        REQUESTS.inc((endpoint, method, str(status)))
+        LATENCY.observe((endpoint, method), elapsed)
+        if size is not None:
+            RESPONSE_BYTES.observe((endpoint,), size)
+
+
+# --- состояние текущего запроса ---
+def _current():
+    return g.get("metrics") if has_request_context() else None
+
+
+def _endpoint():
+    return (request.endpoint or NO_ENDPOINT) if has_request_context() else NO_ENDPOINT
+
+
+def add_phase(phase, seconds):
+    stats = _current()
+    if stats is not None:
+        stats["phases"][phase] = stats["phases"].get(phase, 0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    """Учесть время блока в фазе phase текущего запроса"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(phase, time.perf_counter() - start)
+
+
+# --- SQLAlchemy ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+class _CountingCursor:
+    """
+    Курсор DBAPI, считающий выбранные строки. rowcount для SELECT драйверы
+    не сообщают (-1 у sqlite3 и серверных курсоров), поэтому строки
+    учитываются при выборке — и для потоковых ответов, когда запрос уже выполнен.
+    """
+    __slots__ = ("_cursor", "_endpoint", "_stats")
+
+    def __init__(self, cursor, endpoint, stats):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_endpoint", endpoint)
+        object.__setattr__(self, "_stats", stats)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def _count(self, rows):
+        _count_rows(self._endpoint, self._stats, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+
+def _count_rows(endpoint, stats, rows):
+    if not rows:
+        return
+    with _lock:
+        SQL_ROWS.inc((endpoint,), int(rows))
+    if stats is not None:
+        stats["rows"] += int(rows)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_start"].pop()
+    endpoint = _endpoint()
+    stats = _current()
+    with _lock:
+        SQL_STATEMENTS.inc((endpoint,))
+        SQL_LATENCY.observe((endpoint,), elapsed)
+    if stats is not None:
+        stats["statements"] += 1
+        stats["phases"]["sql"] = stats["phases"].get("sql", 0) + elapsed
+    if cursor.description is None:
+        # INSERT/UPDATE/DELETE без RETURNING: затронутые строки сообщает драйвер
+        _count_rows(endpoint, stats, max(cursor.rowcount or 0, 0))
+    elif context is not None and context.cursor is cursor:
+        # результат (CursorResult) читает строки через context.cursor
+        context.cursor = _CountingCursor(cursor, endpoint, stats)
+
+
+def _on_load(target, context):
+    with _lock:
+        ORM_OBJECTS.inc((_endpoint(),))
+    stats = _current()
+    if stats is not None:
+        stats["objects"] += 1
+
+
+# --- Flask ---
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON-провайдер приложения: время кодирования ответов идёт в фазу serialize"""
+
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+def _before_request():
+    g.metrics = {"start": time.perf_counter(), "statements": 0, "rows": 0, "objects": 0, "phases": {}}
+    if current_app.config["METRICS_PROFILE"] and request.headers.get("X-Profile", "").strip() in ("1", "true"):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def _after_request(response):
+    stats = g.pop("metrics", None)
+    if stats is None:
+        return response
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - stats["start"]
+    endpoint = _endpoint()
+    size = None if response.is_streamed else response.calculate_content_length()
+    observe_request(endpoint, request.method, response.status_code, elapsed, size)
+    with _lock:
+        for phase, seconds in stats["phases"].items():
+            PHASES.observe((endpoint, phase), seconds)
+    if profiler is not None:
+        return profile_response(profiler, stats, elapsed, response)
+    return response
+
+
+def profile_response(profiler, stats, elapsed, response):
+    """Текстовый отчёт профиля вместо ответа; исходный статус — в X-Profile-Status"""
+    out = io.StringIO()
+    out.write(f"{request.method} {request.full_path.rstrip('?')} -> {response.status_code}\n")
+    out.write(f"total {elapsed * 1000:.2f} ms, sql statements {stats['statements']}, "
+              f"rows {stats['rows']}, orm objects {stats['objects']}\n")
+    for phase, seconds in sorted(stats["phases"].items()):
+        out.write(f"  {phase:<10} {seconds * 1000:9.2f} ms\n")
+    out.write("\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+    report = Response(out.getvalue(), mimetype="text/plain")
+    response.close()  # потоковый ответ не будет прочитан — закрыть генератор и его сессию
+    report.headers["X-Profile-Status"] = str(response.status_code)
+    return report
+
+
+def metrics_view():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+_listening = False
+
+
+def init_app(app, profile=False):
+    """Подключить сбор метрик и /metrics к приложению; profile разрешает X-Profile"""
+    global _listening
+    if not _listening:
+        # на класс Engine — метрики видят все движки процесса (и тестовые)
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Base, "load", _on_load, propagate=True)
+        _listening = True
+    app.json = TimedJSONProvider(app)
+    app.config.setdefault("METRICS_PROFILE", profile)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,210 @@
+# migrations.py
+"""
+Версионные миграции схемы БД.
+
+Каждая миграция — функция upgrade(conn) с номером версии; применённые
+версии записываются в таблицу schema_migrations, каждая миграция
+выполняется в своей транзакции. Миграции идемпотентны (IF NOT EXISTS),
+поэтому базы, созданные раньше через create_all или init_db.sql,
+подхватываются без ручных действий.
+
+Запуск: python migrations.py [upgrade|current]
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Date, Text, DateTime, ForeignKey, text, inspect
+)
+
+MIGRATIONS = []  # (версия, название, функция)
+
+
+def migration(version, name):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+_versions = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _versions,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@migration(1, "initial schema")
+def _initial_schema(conn):
+    meta = MetaData()
+    Table(
+        "students", meta,
+        Column("id", Integer, primary_key=True),
+        Column("fio", String(255), nullable=False),
+        Column("date_of_birth", Date, nullable=False),
+        Column("phone", String(50)),
+    )
+    Table(
+        "courses", meta,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(255), nullable=False),
+        Column("description", Text),
+        Column("teacher", String(255)),
+    )
+    Table(
+        "records", meta,
+        Column("id", Integer, primary_key=True),
+        Column("id_student", Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False),
+        Column("course_id", Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False),
+        Column("date", Date, nullable=False),
+        Column("grade", String(10)),
+    )
+    meta.create_all(conn, checkfirst=True)
+
+
+@migration(2, "indexes for list, filter and cascade paths")
+def _hot_path_indexes(conn):
+    for sql in (
+        # /api/records?course_id=&sort= и каскадное удаление курса
+        "CREATE INDEX IF NOT EXISTS ix_records_course_date ON records (course_id, date, id)",
+        # JOIN со студентом и каскадное удаление студента
+        "CREATE INDEX IF NOT EXISTS ix_records_student_date ON records (id_student, date)",
+        # /api/records?sort=asc|desc — keyset по (date, id)
+        "CREATE INDEX IF NOT EXISTS ix_records_date_id ON records (date, id)",
+        # /api/students?sort=asc|desc — keyset по (date_of_birth, id)
+        "CREATE INDEX IF NOT EXISTS ix_students_dob_id ON students (date_of_birth, id)",
+        # /api/courses?teacher=
+        "CREATE INDEX IF NOT EXISTS ix_courses_teacher ON courses (teacher)",
+    ):
+        conn.execute(text(sql))
+
+
+@migration(3, "pg_trgm search indexes")
+def _search_indexes(conn):
+    from search import TRGM_INDEXES_SQL
+    if conn.dialect.name != "postgresql":
+        return  # поиск идёт через n-граммный индекс процесса
+    for sql in TRGM_INDEXES_SQL:
+        conn.execute(text(sql))
+
+
+@migration(4, "table change versions")
+def _table_versions(conn):
+    meta = MetaData()
+    versions = Table(
+        "table_versions", meta,
+        Column("table_name", String(64), primary_key=True),
+        Column("version", Integer, nullable=False),
+    )
+    meta.create_all(conn, checkfirst=True)
+    existing = {row[0] for row in conn.execute(versions.select().with_only_columns(versions.c.table_name))}
+    for name in ("students", "courses", "records"):
+        if name not in existing:
+            conn.execute(versions.insert().values(table_name=name, version=0))
+
+
+@migration(5, "revisions and tombstones for delta sync")
+def _revisions(conn):
+    columns = {table: {c["name"] for c in inspect(conn).get_columns(table)}
+               for table in ("students", "courses", "records")}
+    for table, names in columns.items():
+        if "revision" not in names:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"))
+        # уже существующие строки попадают в первую синхронизацию (since=0)
+        conn.execute(text(f"UPDATE {table} SET revision = 1 WHERE revision = 0"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_revision ON {table} (revision)"))
+    meta = MetaData()
+    Table(
+        "tombstones", meta,
+        Column("id", Integer, primary_key=True),
+        Column("table_name", String(64), nullable=False),
+        Column("row_id", Integer, nullable=False),
+        Column("revision", Integer, nullable=False),
+    )
+    meta.create_all(conn, checkfirst=True)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tombstones_table_revision ON tombstones (table_name, revision)"))
+    if conn.execute(text("SELECT 1 FROM table_versions WHERE table_name = '__revision__'")).first() is None:
+        conn.execute(text("INSERT INTO table_versions (table_name, version) VALUES ('__revision__', 1)"))
+
+
+@migration(6, "numeric grades and grade aggregates")
+def _grade_aggregates(conn):
+    from analytics import rebuild
+    if "grade_value" not in {c["name"] for c in inspect(conn).get_columns("records")}:
+        conn.execute(text("ALTER TABLE records ADD COLUMN grade_value SMALLINT"))
+    conn.execute(text(
+        "UPDATE records SET grade_value = CASE TRIM(grade) "
+        "WHEN '5' THEN 5 WHEN '4' THEN 4 WHEN '3' THEN 3 WHEN '2' THEN 2 END"
+    ))
+    meta = MetaData()
+    Table(
+        "grade_aggregates", meta,
+        Column("scope", String(16), primary_key=True),
+        Column("scope_id", Integer, primary_key=True),
+        Column("month", Date, primary_key=True),
+        *[Column(name, Integer, nullable=False)
+          for name in ("total", "grade_2", "grade_3", "grade_4", "grade_5", "ungraded", "grade_sum")],
+    )
+    meta.create_all(conn, checkfirst=True)
+    rebuild(conn)
+
+
+@migration(7, "ON DELETE CASCADE for records foreign keys")
+def _cascade_foreign_keys(conn):
+    # SQLite: изменить внешний ключ можно только пересозданием таблицы, а проверка
+    # ключей там выключена по умолчанию — записи удаляют обработчики API
+    if conn.dialect.name != "postgresql":
+        return
+    for fk in inspect(conn).get_foreign_keys("records"):
+        if fk["referred_table"] not in ("students", "courses") or fk["options"].get("ondelete", "").upper() == "CASCADE":
+            continue
+        column, name = fk["constrained_columns"][0], fk["name"]
+        conn.execute(text(f"ALTER TABLE records DROP CONSTRAINT {name}, ADD CONSTRAINT {name} "
+                          f"FOREIGN KEY ({column}) REFERENCES {fk['referred_table']}(id) ON DELETE CASCADE"))
+
+
+def current_version(conn):
+    if not inspect(conn).has_table("schema_migrations"):
+        return 0
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def upgrade(engine, target=None):
+    """Применить недостающие миграции (до target включительно); вернуть список применённых версий"""
+    applied = []
+    with engine.begin() as conn:
+        _versions.create_all(conn, checkfirst=True)
+    for version, name, fn in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # параллельно стартующие воркеры не применяют одну миграцию дважды
+                conn.execute(text("SELECT pg_advisory_xact_lock(720514)"))
+            if conn.execute(schema_migrations.select().where(schema_migrations.c.version == version)).first():
+                continue
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.now()))
+            applied.append(version)
+    return applied
+
+
+def main(argv):
+    from models import engine
+    command = argv[1] if len(argv) > 1 else "upgrade"
+    if command == "upgrade":
+        applied = upgrade(engine)
+        print("applied: " + (", ".join(map(str, applied)) if applied else "nothing"))
+    elif command == "current":
+        with engine.connect() as conn:
+            print(current_version(conn))
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
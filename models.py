@@ -1,9 +1,14 @@
 # models.py
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Date, Text, ForeignKey, text
+    create_engine, Column, Integer, SmallInteger, String, Date, Text, ForeignKey, Index, text
 )
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
-from config import DATABASE_URI
+from datetime import date, datetime
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session, validates
+from config import (DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+                    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, DATABASE_REPLICA_URIS,
+                    REPLICA_CHECK_INTERVAL, REPLICA_RETRY_SECONDS)
+from pooling import engine_options
+from replicas import ReplicaSet, RoutingSession
 
 Base = declarative_base()
 
@@ -13,8 +18,16 @@ class Student(Base):
     fio = Column(String(255), nullable=False)
     date_of_birth = Column(Date, nullable=False)
     phone = Column(String(50))
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # см. changes.py
 
-    records = relationship("Record", back_populates="student", cascade="all, delete-orphan")
+    # записи удаляет сама БД (ON DELETE CASCADE) или один DELETE в обработчике — без загрузки в сессию
+    records = relationship("Record", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Индексы создаются миграциями (migrations.py), здесь — для create_all в тестах
+    __table_args__ = (
+        Index("ix_students_dob_id", "date_of_birth", "id"),
+        Index("ix_students_revision", "revision"),
+    )
 
     def to_dict(self):
         return {
@@ -30,8 +43,14 @@ class Course(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text)
     teacher = Column(String(255))
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
+
+    records = relationship("Record", back_populates="course", cascade="all, delete-orphan", passive_deletes=True)
 
-    records = relationship("Record", back_populates="course", cascade="all, delete-orphan")
+    __table_args__ = (
+        Index("ix_courses_teacher", "teacher"),
+        Index("ix_courses_revision", "revision"),
+    )
 
     def to_dict(self):
         return {
@@ -48,10 +67,25 @@ class Record(Base):
     course_id = Column(Integer, ForeignKey('courses.id', ondelete="CASCADE"), nullable=False)
     date = Column(Date, nullable=False)
     grade = Column(String(10))  # '5','4','3','2' or 'Не оценено'
+    grade_value = Column(SmallInteger)  # 2..5, NULL — не оценено (analytics.py)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
 
     student = relationship("Student", back_populates="records")
     course = relationship("Course", back_populates="records")
 
+    @validates("grade")
+    def _sync_grade_value(self, key, grade):
+        from analytics import grade_value
+        self.grade_value = grade_value(grade)
+        return grade
+
+    __table_args__ = (
+        Index("ix_records_course_date", "course_id", "date", "id"),
+        Index("ix_records_student_date", "id_student", "date"),
+        Index("ix_records_date_id", "date", "id"),
+        Index("ix_records_revision", "revision"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -63,12 +97,94 @@ class Record(Base):
             "grade": self.grade
         }
 
+class TableVersion(Base):
+    """Счётчик изменений таблицы (ETag и инвалидация кешей, см. versions.py)"""
+    __tablename__ = 'table_versions'
+    table_name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class GradeAggregate(Base):
+    """Суммы оценок курса или студента за месяц (analytics.py)"""
+    __tablename__ = 'grade_aggregates'
+    scope = Column(String(16), primary_key=True)  # 'course' | 'student'
+    scope_id = Column(Integer, primary_key=True)
+    month = Column(Date, primary_key=True)  # первое число месяца
+    total = Column(Integer, nullable=False, default=0)
+    grade_2 = Column(Integer, nullable=False, default=0)
+    grade_3 = Column(Integer, nullable=False, default=0)
+    grade_4 = Column(Integer, nullable=False, default=0)
+    grade_5 = Column(Integer, nullable=False, default=0)
+    ungraded = Column(Integer, nullable=False, default=0)
+    grade_sum = Column(Integer, nullable=False, default=0)
+
+class Tombstone(Base):
+    """Удалённая строка для инкрементальной синхронизации (changes.py)"""
+    __tablename__ = 'tombstones'
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(64), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_table_revision", "table_name", "revision"),
+    )
+
+# Проекция для чтения записей: запись + ФИО студента + название курса одним SELECT,
+# строки сериализуются напрямую, без ORM-объектов и identity map
+RECORD_ROW_COLUMNS = (
+    Record.id,
+    Record.id_student,
+    Student.fio.label("student_fio"),
+    Record.course_id,
+    Course.name.label("course_name"),
+    Record.date,
+    Record.grade,
+)
+
+def record_row_to_dict(row):
+    """То же, что Record.to_dict(), но для строки из RECORD_ROW_COLUMNS"""
+    return {
+        "id": row.id,
+        "id_student": row.id_student,
+        "student_fio": row.student_fio,
+        "course_id": row.course_id,
+        "course_name": row.course_name,
+        "date": row.date.isoformat() if row.date else None,
+        "grade": row.grade
+    }
+
+def parse_date(value):
+    """
+    Дата из ISO-строки ('2000-01-31', время допускается и отбрасывается)
+    или из date/datetime (ячейки XLSX). ValueError, если значение не дата.
+    Общая для API, пакетных операций и импорта.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid date: {value!r}")
+    return datetime.fromisoformat(value.strip()).date()
+
 # DB engine and session factory
-engine = create_engine(DATABASE_URI, echo=False, future=True)
-SessionLocal = scoped_session(sessionmaker(bind=engine, autocommit=False, autoflush=False))
+def _create_engine(url):
+    return create_engine(url, echo=False, future=True, **engine_options(
+        url, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+        DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS))
+
+engine = _create_engine(DATABASE_URI)
+replica_set = ReplicaSet([_create_engine(url) for url in DATABASE_REPLICA_URIS],
+                         REPLICA_CHECK_INTERVAL, REPLICA_RETRY_SECONDS)
+# Сессия на поток; в веб-запросе закрывается при teardown (api.remove_session).
+# Внутри replicas.reading() чтение идёт на реплику, запись — всегда в engine
+SessionLocal = scoped_session(sessionmaker(bind=engine, class_=RoutingSession, replicas=replica_set,
+                                           autocommit=False, autoflush=False))
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """Привести схему к последней версии (см. migrations.py)"""
+    from migrations import upgrade
+    upgrade(engine)
 
 def get_students_data():
     with engine.connect() as conn:
@@ -0,0 +1,85 @@
+# pdf_export.py
+"""Согласие на обработку персональных данных в PDF (reportlab)"""
+from io import BytesIO
+from datetime import datetime
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.enums import TA_JUSTIFY
+from reportlab import rl_config
+from resources import pdf_font, pdf_logo, pdf_signature
+
+# ASCII85 для картинок в reportlab кодируется на чистом Python и занимает
+# большую часть времени рендеринга; бинарные потоки к тому же короче
+rl_config.useA85 = 0
+
+
+def draw_consent(c, fio, phone=None):
+    """Нарисовать страницу согласия на холсте c (шрифт и картинки — из кеша resources)"""
+    width, height = A4
+    font = pdf_font()
+    logo = pdf_logo()
+    signature = pdf_signature()
+
+    # Логотип (прозрачный PNG)
+    if logo is not None:
+        c.drawImage(logo, width - 4*cm, height - 4*cm, width=3*cm, height=3*cm, mask='auto')
+
+    # Заголовок
+    c.setFont(font, 16)
+    title_y = height - 5*cm
+    c.drawCentredString(width/2, title_y, "СОГЛАСИЕ НА ОБРАБОТКУ ПЕРСОНАЛЬНЫХ ДАННЫХ")
+
+    style = ParagraphStyle(
+        name="Justify",
+        fontName=font,
+        fontSize=12,
+        leading=15,        # межстрочный интервал
+        alignment=TA_JUSTIFY,
+        leftIndent=2*cm,
+        rightIndent=2*cm
+    )
+
+    text = f"Я, {fio}, даю согласие на обработку моих персональных данных в соответствии с действующим законодательством Российской Федерации."
+    p = Paragraph(text, style)
+    w, h = p.wrap(width - 3*cm, height)
+    text_y = title_y - 1*cm  # отступ от заголовка
+    p.drawOn(c, 0.5*cm, text_y - h)
+
+    # Контактный телефон
+    phone_text = f"Контактный телефон: {phone or 'не указан'}"
+    p2 = Paragraph(phone_text, style)
+    w2, h2 = p2.wrap(width - 4*cm, height)
+    p2.drawOn(c, 0.5*cm, text_y - h - 0.5*cm - h2)
+
+    # Подпись-загогулина
+    if signature is not None:
+        c.drawImage(signature, 2*cm, 4*cm, width=6*cm, height=2*cm, mask='auto')
+    else:
+        c.drawString(2*cm, 5*cm, "Подпись: ____________________________")
+
+    # Дата
+    date_text = f"Дата: {datetime.now().strftime('%d.%m.%Y')}"
+    c.drawString(2*cm, 3*cm, date_text)
+
+    c.showPage()
+
+
+def render_consent(fio, phone=None):
+    """Сформировать согласие и вернуть содержимое PDF; FileNotFoundError, если нет шрифта"""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    draw_consent(c, fio, phone)
+    c.save()
+    return buffer.getvalue()
+
+
+def render_consents_file(students, out_path):
+    """Все согласия одним многостраничным PDF в out_path; students — список (fio, phone)"""
+    c = canvas.Canvas(out_path, pagesize=A4)
+    for fio, phone in students:
+        draw_consent(c, fio, phone)
+    c.save()
+    return out_path
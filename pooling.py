@@ -0,0 +1,85 @@
+# pooling.py
+"""
+Пул соединений с БД: параметры из config.py и замер ожидания соединения.
+
+engine_options собирает аргументы create_engine: размер пула, overflow,
+recycle, pre-ping, тайм-аут ожидания и statement_timeout (PostgreSQL).
+TimedQueuePool — QueuePool, который меряет, сколько запрос ждал свободное
+соединение (включая открытие нового) и сколько раз не дождался. Сводка
+(wait_stats / pool_status) отдаётся в /metrics (metrics.py).
+"""
+import time
+import threading
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+
+class WaitStats:
+    """Гистограмма ожидания соединения из пула (накопительные корзины WAIT_BUCKETS)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(WAIT_BUCKETS) + 1)
+            self.total = 0.0
+            self.timeouts = 0
+
+    def observe(self, seconds):
+        with self._lock:
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+            self.counts[-1] += 1
+            self.total += seconds
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, self.timeouts
+
+
+wait_stats = WaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            wait_stats.timeout()
+            raise
+        finally:
+            wait_stats.observe(time.perf_counter() - start)
+
+
+def engine_options(url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800,
+                   pre_ping=True, statement_timeout_ms=0):
+    """Аргументы create_engine для url"""
+    url = make_url(url)
+    options = {"pool_pre_ping": pre_ping}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options  # база в памяти живёт в единственном соединении — пул по умолчанию
+    options.update(poolclass=TimedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                   pool_timeout=pool_timeout, pool_recycle=pool_recycle)
+    if statement_timeout_ms and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout_ms)}"}
+    return options
+
+
+def pool_status(engine):
+    """{"size", "checked_out", "idle", "overflow"} для QueuePool, иначе None"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0)}
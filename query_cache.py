@@ -0,0 +1,180 @@
+# query_cache.py
+"""
+Кеш результатов списков API (read-through).
+
+Ключ — путь, нормализованные параметры запроса и версии таблиц
+(versions.py), поэтому запись другого процесса тоже делает старые
+записи недостижимыми. Обработчики записи дополнительно сразу удаляют
+записи затронутой таблицы (invalidate), чтобы они не занимали место.
+
+Бэкенды:
+  MemoryBackend — LRU + TTL в памяти процесса (по умолчанию)
+  RedisBackend  — общий для всех воркеров; нужен клиент с API redis-py
+                  (QUERY_CACHE_URL=redis://...)
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+# Значения параметров, равнозначные их отсутствию
+DEFAULT_ARGS = {"q": "", "teacher": "", "course_id": "", "sort": "default"}
+
+
+def cache_key(path, args, versions):
+    """Ключ по пути, параметрам (порядок и параметры по умолчанию не важны) и версиям таблиц"""
+    items = sorted((k, v.strip()) for k, v in args.items(multi=True) if DEFAULT_ARGS.get(k) != v.strip())
+    raw = f"{path}?{urlencode(items)}#{'.'.join(map(str, versions))}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(("hits", "misses", "sets", "evictions", "expired", "invalidations"), 0)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+class MemoryBackend:
+    """LRU на max_entries записей, каждая живёт не дольше ttl секунд"""
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # ключ -> (истекает, значение, таблицы)
+        self._tags = {}  # таблица -> множество ключей
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(key)
+                self.stats.incr("expired")
+                entry = None
+            if entry is None:
+                self.stats.incr("misses")
+                return None
+            self._entries.move_to_end(key)
+        self.stats.incr("hits")
+        return entry[1]
+
+    def set(self, key, value, tables):
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tuple(tables))
+            for table in tables:
+                self._tags.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats.incr("evictions")
+        self.stats.incr("sets")
+
+    def invalidate(self, table):
+        with self._lock:
+            keys = list(self._tags.get(table, ()))
+            for key in keys:
+                self._drop(key)
+        self.stats.incr("invalidations", len(keys))
+        return len(keys)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._tags.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[table]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+
+class RedisBackend:
+    """
+    Общий кеш в Redis: значение живёт ttl секунд (вытеснение — на стороне
+    сервера), множество qc:tag:<таблица> хранит ключи для invalidate.
+    Подходит любой клиент с методами get/set/delete/sadd/smembers/expire.
+    """
+
+    def __init__(self, client, ttl=60, prefix="qc:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        self.stats.incr("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key, value, tables):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+        for table in tables:
+            tag = f"{self.prefix}tag:{table}"
+            self.client.sadd(tag, self.prefix + key)
+            self.client.expire(tag, self.ttl)
+        self.stats.incr("sets")
+
+    def invalidate(self, table):
+        tag = f"{self.prefix}tag:{table}"
+        keys = list(self.client.smembers(tag))
+        if keys:
+            self.client.delete(*keys)
+        self.client.delete(tag)
+        self.stats.incr("invalidations", len(keys))
+        return len(keys)
+
+    def clear(self):
+        pass  # общий кеш не чистим целиком: ключи со старыми версиями истекут по TTL
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def make_backend(url, max_entries, ttl):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis  # необязательная зависимость, нужна только для общего кеша
+        return RedisBackend(redis.Redis.from_url(url), ttl)
+    return MemoryBackend(max_entries, ttl)
+
+
+def get_cache():
+    """Кеш процесса, создаётся при первом обращении по настройкам config.py"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config import QUERY_CACHE_URL, QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+            _cache = make_backend(QUERY_CACHE_URL, QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        return _cache
+
+
+def set_cache(backend):
+    """Подменить бэкенд (тесты, настройка из кода приложения)"""
+    global _cache
+    with _cache_lock:
+        _cache = backend
+
+
+def invalidate(*tables):
+    cache = get_cache()
+    for table in tables:
+        cache.invalidate(table)
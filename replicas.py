@@ -0,0 +1,104 @@
+# replicas.py
+"""
+Чтение с реплик БД (DATABASE_REPLICA_URIS в config.py).
+
+RoutingSession — сессия, у которой основная база (primary) остаётся
+привязкой по умолчанию, а запросы внутри reading() уходят на реплику.
+Реплика выбирается один раз на сессию (в вебе — на запрос), поэтому версии
+таблиц для ETag и сами данные читаются из одного источника. Запись
+(flush, INSERT/UPDATE/DELETE) всегда идёт в primary.
+
+ReplicaSet раздаёт реплики по кругу. Перед выдачей реплика проверяется
+(соединение из пула с pre-ping) не чаще раза в check_interval секунд;
+недоступная пропускается retry_after секунд. Если доступных реплик нет,
+чтение прозрачно идёт в primary.
+
+Локально репликами могут служить любые базы той же схемы, например копии
+файла SQLite: DATABASE_REPLICA_URLS=sqlite:///replica1.db,sqlite:///replica2.db
+"""
+import time
+import threading
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import exc
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+_reading = ContextVar("read_from_replica", default=False)
+
+
+@contextmanager
+def reading():
+    """Запросы сессий, впервые обратившихся к БД внутри блока, идут на реплику"""
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+class ReplicaSet:
+    def __init__(self, engines, check_interval=2.0, retry_after=10.0):
+        self.engines = list(engines)
+        self.check_interval, self.retry_after = check_interval, retry_after
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._checked_at = [0.0] * len(self.engines)
+        self._down_until = [0.0] * len(self.engines)
+        self.reads = [0] * len(self.engines)
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self.engines)
+
+    def _usable(self, i, now):
+        if self._down_until[i] > now:
+            return False
+        if now - self._checked_at[i] < self.check_interval:
+            return True
+        try:
+            self.engines[i].connect().close()
+        except (exc.DBAPIError, exc.TimeoutError):
+            with self._lock:
+                self._down_until[i] = now + self.retry_after
+            return False
+        with self._lock:
+            self._checked_at[i] = now
+        return True
+
+    def pick(self):
+        """Следующая доступная реплика по кругу или None (читать из primary)"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            i = next(self._next) % len(self.engines)
+            if self._usable(i, now):
+                with self._lock:
+                    self.reads[i] += 1
+                return self.engines[i]
+        if self.engines:
+            with self._lock:
+                self.fallbacks += 1
+        return None
+
+    def status(self):
+        """[{"replica", "up", "reads"}, ...] для /metrics"""
+        now = time.monotonic()
+        return [{"replica": i, "up": self._down_until[i] <= now, "reads": self.reads[i]}
+                for i in range(len(self.engines))]
+
+
+class RoutingSession(Session):
+    def __init__(self, replicas=None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        # без mapper/clause спрашивают «домашнюю» базу сессии (поиск, COPY) — это primary
+        routed = mapper is not None or clause is not None
+        if routed and not self._flushing and not isinstance(clause, UpdateBase):
+            if "replica" not in self.info:
+                self.info["replica"] = self.replicas.pick() if self.replicas and _reading.get() else None
+            if self.info["replica"] is not None:
+                return self.info["replica"]
+        return super().get_bind(mapper, clause=clause, **kwargs)
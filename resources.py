@@ -0,0 +1,99 @@
+# resources.py
+"""
+Кеш ресурсов для генерации документов на весь процесс.
+
+Шрифт регистрируется в reportlab один раз, логотип и подпись хранятся
+уже декодированными (ImageReader). Файл перечитывается только при смене
+mtime, а сам mtime проверяется не чаще раза в CHECK_INTERVAL секунд.
+"""
+import os
+import time
+import threading
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.utils import ImageReader
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = os.path.join(BASE_DIR, "templates", "DejaVuLGCSans.ttf")
+LOGO_PATH = os.path.join(BASE_DIR, "static", "images", "logo.png")
+SIGNATURE_PATH = os.path.join(BASE_DIR, "static", "images", "signature.png")
+FONT_NAME = "DejaVu"
+
+CHECK_INTERVAL = 1.0
+
+
+class CachedFile:
+    """Значение, загруженное из файла; None, если файла нет"""
+
+    def __init__(self, path, loader, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._value = None
+        self._mtime = None
+        self._checked = None
+
+    def get(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return self._value
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if self._checked is None or mtime != self._mtime:
+                self._value = self.loader(self.path) if mtime is not None else None
+                self._mtime = mtime
+                self.loads += 1
+            self._checked = now
+        return self._value
+
+    def clear(self):
+        with self._lock:
+            self._value = self._mtime = self._checked = None
+
+
+def _register_font(path):
+    pdfmetrics.registerFont(TTFont(FONT_NAME, path))
+    return FONT_NAME
+
+
+def _load_image(path):
+    reader = ImageReader(path)
+    reader.getRGBData()  # декодируем PNG сразу, а не при первом drawImage
+    return reader
+
+
+_font = CachedFile(FONT_PATH, _register_font)
+_logo = CachedFile(LOGO_PATH, _load_image)
+_signature = CachedFile(SIGNATURE_PATH, _load_image)
+
+
+def pdf_font():
+    """Имя зарегистрированного шрифта с кириллицей; FileNotFoundError, если файла нет"""
+    name = _font.get()
+    if name is None:
+        raise FileNotFoundError(f"Шрифт не найден: {FONT_PATH}")
+    return name
+
+
+def pdf_logo():
+    return _logo.get()
+
+
+def pdf_signature():
+    return _signature.get()
+
+
+def warm():
+    """Загрузить всё заранее (при старте процесса/воркера пула)"""
+    for cached in (_font, _logo, _signature):
+        cached.get()
+
+
+def clear():
+    for cached in (_font, _logo, _signature):
+        cached.clear()
@@ -1,4 +1,5 @@
 #!/usr/bin/env bash
 export FLASK_APP=app.py
 export FLASK_ENV=development
+flask init-db
 flask run --host=0.0.0.0 --port=5000
@@ -0,0 +1,217 @@
+# search.py
+"""
+Подстрочный поиск по ФИО студентов и названиям курсов (параметр q).
+
+PostgreSQL: ILIKE '%q%' по GIN-индексам pg_trgm, ранжирование по
+similarity(). Остальные СУБД (SQLite в тестах и локально): n-граммный
+индекс в памяти процесса — строится при первом поиске одним запросом,
+сразу обновляется обработчиками записи (index_upsert/index_remove), а перед
+каждым поиском догоняет общий счётчик ревизий (changes.py): строки и
+надгробия, записанные другими процессами, применяются по revision.
+Сравнение без учёта регистра, в том числе для кириллицы.
+"""
+import heapq
+import threading
+import weakref
+from collections import defaultdict
+from sqlalchemy import bindparam, func
+from models import Student, Course, Tombstone
+from changes import current_revision
+
+NGRAM = 3
+RANK_BATCH = 4  # во сколько раз больше limit брать кандидатов за проход
+
+# таблица -> (колонка id, колонка текста)
+SEARCH_FIELDS = {
+    "students": (Student.id, Student.fio),
+    "courses": (Course.id, Course.name),
+}
+
+# Индексы для PostgreSQL (применяются миграцией 3, см. migrations.py)
+TRGM_INDEXES_SQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_students_fio_trgm ON students USING gin (fio gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_courses_name_trgm ON courses USING gin (name gin_trgm_ops)",
+)
+
+
+def normalize(value):
+    return " ".join((value or "").casefold().split())
+
+
+def _ngrams(value):
+    return {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+
+class NgramIndex:
+    """Индекс id -> текст с постинг-листами по триграммам"""
+
+    def __init__(self):
+        self._texts = {}
+        self._postings = defaultdict(set)
+        self._lock = threading.Lock()
+        self.revision = 0  # ревизия (changes.py), до которой применены изменения таблицы
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, row_id, value):
+        with self._lock:
+            self._remove(row_id)
+            value = normalize(value)
+            self._texts[row_id] = value
+            for gram in _ngrams(value):
+                self._postings[gram].add(row_id)
+
+    def remove(self, row_id):
+        with self._lock:
+            self._remove(row_id)
+
+    def _remove(self, row_id):
+        old = self._texts.pop(row_id, None)
+        if old is None:
+            return
+        for gram in _ngrams(old):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(row_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def _candidates(self, query):
+        grams = _ngrams(query)
+        if not grams:
+            return self._texts.keys()  # короткий запрос — полный проход по строкам в памяти
+        sets = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        if not sets[0]:
+            return ()
+        return set(sets[0]).intersection(*sets[1:])
+
+    def search(self, query, limit=None):
+        """id строк, содержащих query, по убыванию релевантности"""
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            matches = []
+            for row_id in self._candidates(query):
+                value = self._texts[row_id]
+                pos = value.find(query)
+                if pos < 0:
+                    continue
+                word_start = pos == 0 or value[pos - 1] == " "
+                # раньше — совпадение с начала, затем с начала слова, затем более короткие строки
+                matches.append((pos != 0, not word_start, len(value), row_id))
+        ranked = heapq.nsmallest(limit, matches) if limit else sorted(matches)
+        return [m[3] for m in ranked]
+
+
+_indexes = weakref.WeakKeyDictionary()  # engine (primary или реплика) -> {таблица: NgramIndex}
+_indexes_lock = threading.Lock()
+
+
+def _use_sql(db):
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _read_bind(db, table):
+    """
+    Движок, из которого сессия читает таблицу: внутри replica_read — реплика
+    (replicas.RoutingSession), иначе primary. По нему ключуется индекс, чтобы
+    ревизия, догоняющие запросы и строки индекса были из одной базы.
+    """
+    return db.get_bind(SEARCH_FIELDS[table][0].class_)
+
+
+def _index(db, table):
+    """Индекс таблицы для движка, с которого читает сессия, догнанный до его текущей ревизии"""
+    bind = _read_bind(db, table)
+    revision = current_revision(db)
+    with _indexes_lock:
+        tables = _indexes.setdefault(bind, {})
+        index = tables.get(table)
+        if index is None or revision < index.revision:  # впервые или база восстановлена из копии
+            index = tables[table] = NgramIndex()
+            _catch_up(db, table, index, None, revision)
+        elif revision > index.revision:
+            _catch_up(db, table, index, index.revision, revision)
+        return index
+
+
+def _catch_up(db, table, index, since, until):
+    """Применить к индексу удаления и изменения с since < revision <= until (since=None — все строки)"""
+    id_col, text_col = SEARCH_FIELDS[table]
+    rows = db.query(id_col, text_col)
+    if since is not None:
+        deleted = db.query(Tombstone.row_id).filter(Tombstone.table_name == table, Tombstone.revision > since,
+                                                     Tombstone.revision <= until)
+        for (row_id,) in deleted:
+            index.remove(row_id)
+        revision = id_col.class_.revision
+        rows = rows.filter(revision > since, revision <= until)
+    for row_id, value in rows.yield_per(10000):
+        index.add(row_id, value)
+    index.revision = until
+
+
+def index_upsert(db, table, row_id, value):
+    """
+    Обновить строку в индексе процесса (после commit в обработчике записи).
+    Запись идёт в primary; индексы реплик догонят её по ревизии при поиске.
+    """
+    index = _indexes.get(db.get_bind(), {}).get(table)
+    if index is not None:
+        index.add(row_id, value)
+
+
+def index_remove(db, table, row_id):
+    index = _indexes.get(db.get_bind(), {}).get(table)
+    if index is not None:
+        index.remove(row_id)
+
+
+def index_reset(db, table):
+    """Забыть индекс таблицы (после массовой загрузки): он перестроится при следующем поиске"""
+    with _indexes_lock:
+        _indexes.get(db.get_bind(), {}).pop(table, None)
+
+
+def _in_ids(column, ids):
+    # значения подставляются прямо в SQL: у SQLite ограничено число параметров
+    return column.in_(bindparam(f"{column.table.name}_search_ids", list(ids), expanding=True, literal_execute=True))
+
+
+def search_filter(db, table, q):
+    """Условие WHERE: текстовое поле таблицы содержит q"""
+    id_col, text_col = SEARCH_FIELDS[table]
+    if _use_sql(db):
+        return text_col.ilike(f"%{q}%")
+    return _in_ids(id_col, _index(db, table).search(q))
+
+
+def ranked_search(db, query, table, q, limit=None, offset=0):
+    """
+    Строки query (с уже наложенными прочими фильтрами), где поле содержит q,
+    в порядке релевантности; если задан limit — не больше limit, начиная с offset.
+    """
+    id_col, text_col = SEARCH_FIELDS[table]
+    if _use_sql(db):
+        query = query.filter(text_col.ilike(f"%{q}%")) \
+            .order_by(func.similarity(text_col, q).desc(), id_col)
+        return query.offset(offset).limit(limit).all() if limit else query.all()
+
+    ranked = _index(db, table).search(q)
+    if not limit:
+        rows = {getattr(r, id_col.key): r for r in query.filter(_in_ids(id_col, ranked)).all()}
+        return [rows[i] for i in ranked if i in rows]
+    # прочие фильтры могут отсеять кандидатов — добираем пачками до offset + limit
+    result = []
+    wanted = offset + limit
+    batch = wanted * RANK_BATCH
+    for start in range(0, len(ranked), batch):
+        chunk = ranked[start:start + batch]
+        rows = {getattr(r, id_col.key): r for r in query.filter(_in_ids(id_col, chunk)).all()}
+        result.extend(rows[i] for i in chunk if i in rows)
+        if len(result) >= wanted:
+            break
+    return result[offset:wanted]
@@ -19,38 +19,84 @@ $(function() {
     return `<span class="grade-pill grade-na">${grade}</span>`;
   }
 
+  // --- Локальная копия студентов и курсов (GET /api/changes) ---
+  // Списки для выпадающих меню не перекачиваются целиком: догружаются только изменения.
+  // Копия хранится в localStorage, так что новая загрузка страницы продолжает с сохранённой ревизии
+  const LOCAL_COPY_KEY = 'localCopy.v1';
+  const localCopy = loadLocalCopy();
+  let syncing = null;
+
+  function loadLocalCopy() {
+    try {
+      const saved = JSON.parse(localStorage.getItem(LOCAL_COPY_KEY));
+      if (saved && Number.isInteger(saved.revision)) {
+        return { revision: saved.revision, students: new Map(saved.students), courses: new Map(saved.courses) };
+      }
+    } catch (e) { /* нет доступа к localStorage или испорченная запись — начинаем с нуля */ }
+    return { revision: 0, students: new Map(), courses: new Map() };
+  }
+
+  function saveLocalCopy() {
+    try {
+      localStorage.setItem(LOCAL_COPY_KEY, JSON.stringify({
+        revision: localCopy.revision, students: [...localCopy.students], courses: [...localCopy.courses]
+      }));
+    } catch (e) { /* квота или приватный режим — копия останется только в памяти */ }
+  }
+
+  function syncLocalCopy() {
+    if (syncing) return syncing;
+    const result = $.Deferred();
+    syncing = result.promise();
+    (function step() {
+      $.getJSON('/api/changes', { since: localCopy.revision, tables: 'students,courses' }).done(function(data) {
+        if (data.reset) { localCopy.students.clear(); localCopy.courses.clear(); }
+        ['students', 'courses'].forEach(t => {
+          data.deleted[t].forEach(id => localCopy[t].delete(id));
+          data[t].forEach(row => localCopy[t].set(row.id, row));
+        });
+        localCopy.revision = data.revision;
+        if (data.has_more) return step();
+        saveLocalCopy();
+        syncing = null;
+        result.resolve(localCopy);
+      }).fail(function() { syncing = null; result.reject(); });
+    })();
+    return syncing;
+  }
+
   // --- LOAD initial lists for selects (students, courses) ---
   function loadStudentsForSelect(selectId) {
-    $.getJSON('/api/students').done(function(data) {
+    syncLocalCopy().done(function(copy) {
       const sel = $(selectId);
       sel.empty();
-      data.forEach(s => sel.append(`<option value="${s.id}">${s.fio}</option>`));
+      copy.students.forEach(s => sel.append(`<option value="${s.id}">${s.fio}</option>`));
     });
   }
   function loadCoursesForSelect(selectId) {
-    $.getJSON('/api/courses').done(function(data) {
+    syncLocalCopy().done(function(copy) {
       const sel = $(selectId);
       sel.empty();
       sel.append(`<option value="">-- выберите --</option>`);
-      data.forEach(c => sel.append(`<option value="${c.id}">${c.name}</option>`));
+      copy.courses.forEach(c => sel.append(`<option value="${c.id}">${c.name}</option>`));
     });
   }
 
   // Fill filters on main page
   function fillCourseFilter() {
-    $.getJSON('/api/courses').done(function(data) {
+    syncLocalCopy().done(function(copy) {
       const sel = $('#records-course-filter');
       sel.empty();
       sel.append(`<option value="">Все курсы</option>`);
-      data.forEach(c => sel.append(`<option value="${c.id}">${c.name}</option>`));
+      copy.courses.forEach(c => sel.append(`<option value="${c.id}">${c.name}</option>`));
     });
   }
 
   // fill teachers filter on courses page
   function fillTeachersFilter() {
-    $.getJSON('/api/courses').done(function(data) {
+    syncLocalCopy().done(function(copy) {
       const teacherSet = new Set();
-      data.forEach(c => { if (c.teacher) teacherSet.add(c.teacher) });
+      copy.courses.forEach(c => { if (c.teacher) teacherSet.add(c.teacher) });
       const sel = $('#courses-teacher-filter');
       sel.empty();
       sel.append(`<option value="">Все преподаватели</option>`);
@@ -58,30 +104,49 @@ $(function() {
     });
   }
 
+  // --- Постраничная подгрузка (cursor pagination) ---
+  const PAGE_SIZE = 50;
+
+  // Загружает первую страницу в tbody, следующие — по кнопке «Показать ещё»
+  function loadPaged(url, params, tbody, renderRow) {
+    if (!tbody.length) return;  // таблицы нет на этой странице
+    const table = tbody.closest('table');
+    let more = table.next('.load-more');
+    if (!more.length) {
+      more = $('<button type="button" class="btn btn-outline-secondary btn-sm m-2 load-more d-none">Показать ещё</button>');
+      table.after(more);
+    }
+    const token = {};
+    tbody.data('pager', token);
+    tbody.empty();
+
+    function fetchPage(cursor) {
+      const query = Object.assign({}, params, { limit: PAGE_SIZE });
+      if (cursor) query.cursor = cursor;
+      more.prop('disabled', true);
+      $.getJSON(url, query).done(function(data) {
+        if (tbody.data('pager') !== token) return;  // фильтр поменялся, ответ устарел
+        data.items.forEach(item => tbody.append(renderRow(item)));
+        more.off('click').prop('disabled', false).toggleClass('d-none', !data.next_cursor);
+        if (data.next_cursor) more.on('click', () => fetchPage(data.next_cursor));
+      });
+    }
+    fetchPage(null);
+  }
+
   // --- Records table ---
   function loadRecords(params={}) {
-    $.getJSON('/api/records', params).done(function(data) {
-      const tbody = $('#records-table tbody');
-      tbody.empty();
-      data.forEach(r => {
-        const row = `<tr data-id="${r.id}">
+    loadPaged('/api/records', params, $('#records-table tbody'), r => `<tr data-id="${r.id}">
           <td>${r.student_fio || ''}</td>
           <td>${r.course_name || ''}</td>
           <td>${formatDate(r.date)}</td>
           <td>${renderGrade(r.grade)}</td>
-        </tr>`;
-        tbody.append(row);
-      });
-    });
+        </tr>`);
   }
 
   // --- Students table ---
  function loadStudents(params={}) {
-   $.getJSON('/api/students', params).done(function(data) {
-     const tbody = $('#students-table tbody');
-     tbody.empty();
-     data.forEach(s => {
-       const row = `<tr data-id="${s.id}">
+   loadPaged('/api/students', params, $('#students-table tbody'), s => `<tr data-id="${s.id}">
          <td>${s.fio}</td>
          <td>${formatDate(s.date_of_birth)}</td>
          <td>${s.phone || ''}</td>
@@ -89,22 +154,13 @@ $(function() {
            <a href="/documents/generate-word/${s.id}" class="btn btn-primary btn-sm" target="_blank">Word</a>
            <a href="/pdf/generate-pdf/${s.id}" class="btn btn-danger btn-sm" target="_blank">PDF</a>
          </td>
-       </tr>`;
-       tbody.append(row);
-     });
-   });
+       </tr>`);
  }
 
   // --- Courses table ---
   function loadCourses(params={}) {
-    $.getJSON('/api/courses', params).done(function(data) {
-      const tbody = $('#courses-table tbody');
-      tbody.empty();
-      data.forEach(c => {
-        const row = `<tr data-id="${c.id}"><td>${c.name}</td><td>${c.description || ''}</td><td>${c.teacher || ''}</td></tr>`;
-        tbody.append(row);
-      });
-    });
+    loadPaged('/api/courses', params, $('#courses-table tbody'),
+      c => `<tr data-id="${c.id}"><td>${c.name}</td><td>${c.description || ''}</td><td>${c.teacher || ''}</td></tr>`);
   }
 
   // --- Add/Edit page: list of chosen table on right ---
@@ -114,19 +170,16 @@ $(function() {
     thead.empty(); tbody.empty();
     if (table==='students') {
       thead.html('<tr><th>ФИО</th><th>Дата рождения</th><th>Телефон</th></tr>');
-      $.getJSON('/api/students').done(function(data){
-        data.forEach(s => tbody.append(`<tr data-id="${s.id}"><td>${s.fio}</td><td>${formatDate(s.date_of_birth)}</td><td>${s.phone||''}</td></tr>`));
-      });
+      loadPaged('/api/students', {}, tbody,
+        s => `<tr data-id="${s.id}"><td>${s.fio}</td><td>${formatDate(s.date_of_birth)}</td><td>${s.phone||''}</td></tr>`);
     } else if (table==='courses') {
       thead.html('<tr><th>Название</th><th>Описание</th><th>Преподаватель</th></tr>');
-      $.getJSON('/api/courses').done(function(data){
-        data.forEach(c => tbody.append(`<tr data-id="${c.id}"><td>${c.name}</td><td>${c.description||''}</td><td>${c.teacher||''}</td></tr>`));
-      });
+      loadPaged('/api/courses', {}, tbody,
+        c => `<tr data-id="${c.id}"><td>${c.name}</td><td>${c.description||''}</td><td>${c.teacher||''}</td></tr>`);
     } else {
       thead.html('<tr><th>Студент</th><th>Курс</th><th>Дата</th><th>Оценка</th></tr>');
-      $.getJSON('/api/records').done(function(data){
-        data.forEach(r => tbody.append(`<tr data-id="${r.id}"><td>${r.student_fio||''}</td><td>${r.course_name||''}</td><td>${formatDate(r.date)}</td><td>${r.grade||''}</td></tr>`));
-      });
+      loadPaged('/api/records', {}, tbody,
+        r => `<tr data-id="${r.id}"><td>${r.student_fio||''}</td><td>${r.course_name||''}</td><td>${formatDate(r.date)}</td><td>${r.grade||''}</td></tr>`);
     }
   }
 
@@ -137,19 +190,16 @@ $(function() {
     thead.empty(); tbody.empty();
     if (table==='students') {
       thead.html('<tr><th>ФИО</th><th>Дата рождения</th></tr>');
-      $.getJSON('/api/students').done(function(data){
-        data.forEach(s => tbody.append(`<tr data-id="${s.id}"><td>${s.fio}</td><td>${formatDate(s.date_of_birth)}</td></tr>`));
-      });
+      loadPaged('/api/students', {}, tbody,
+        s => `<tr data-id="${s.id}"><td>${s.fio}</td><td>${formatDate(s.date_of_birth)}</td></tr>`);
     } else if (table==='courses') {
       thead.html('<tr><th>Название</th><th>Преподаватель</th></tr>');
-      $.getJSON('/api/courses').done(function(data){
-        data.forEach(c => tbody.append(`<tr data-id="${c.id}"><td>${c.name}</td><td>${c.teacher||''}</td></tr>`));
-      });
+      loadPaged('/api/courses', {}, tbody,
+        c => `<tr data-id="${c.id}"><td>${c.name}</td><td>${c.teacher||''}</td></tr>`);
     } else {
       thead.html('<tr><th>Студент</th><th>Курс</th><th>Дата</th></tr>');
-      $.getJSON('/api/records').done(function(data){
-        data.forEach(r => tbody.append(`<tr data-id="${r.id}"><td>${r.student_fio||''}</td><td>${r.course_name||''}</td><td>${formatDate(r.date)}</td></tr>`));
-      });
+      loadPaged('/api/records', {}, tbody,
+        r => `<tr data-id="${r.id}"><td>${r.student_fio||''}</td><td>${r.course_name||''}</td><td>${formatDate(r.date)}</td></tr>`);
     }
   }
 
@@ -211,9 +261,7 @@ $(function() {
     if (!id) return;
     // fetch entity and populate form
     if (table === 'students') {
-      $.getJSON(`/api/students`).done(function(data){
-        const s = data.find(x => x.id === id);
-        if (!s) return;
+      $.getJSON(`/api/students/${id}`).done(function(s){
         $('#student-fio').val(s.fio);
         $('#student-dob').val(s.date_of_birth);
         $('#student-phone').val(s.phone);
@@ -221,9 +269,7 @@ $(function() {
         $('#student-edit-btn').removeClass('d-none').data('id', id);
       });
     } else if (table === 'courses') {
-      $.getJSON('/api/courses').done(function(data){
-        const c = data.find(x => x.id === id);
-        if (!c) return;
+      $.getJSON(`/api/courses/${id}`).done(function(c){
         $('#course-name').val(c.name);
         $('#course-desc').val(c.description);
         $('#course-teacher').val(c.teacher);
@@ -231,9 +277,7 @@ $(function() {
         $('#course-edit-btn').removeClass('d-none').data('id', id);
       });
     } else {
-      $.getJSON('/api/records').done(function(data){
-        const r = data.find(x => x.id === id);
-        if (!r) return;
+      $.getJSON(`/api/records/${id}`).done(function(r){
         $('#record-student').val(r.id_student);
         $('#record-course').val(r.course_id);
         $('#record-date').val(r.date);
@@ -0,0 +1,33 @@
+# versions.py
+"""
+Версии таблиц: счётчик в table_versions, который обработчики записи
+увеличивают в той же транзакции, что и само изменение. По версиям
+строятся ETag ответов API — проверка If-None-Match стоит одного
+SELECT по первичному ключу вместо выполнения запроса списка.
+"""
+from sqlalchemy import update
+from models import TableVersion
+
+
+def get_versions(db, tables):
+    """Версии таблиц в порядке tables (0 для таблиц, которые ещё не менялись)"""
+    rows = dict(db.query(TableVersion.table_name, TableVersion.version)
+                .filter(TableVersion.table_name.in_(tables)).all())
+    return tuple(rows.get(name, 0) for name in tables)
+
+
+def bump_versions(db, *tables):
+    """Увеличить версии таблиц; вызывается до db.commit() изменяющего запроса"""
+    for name in tables:
+        result = db.execute(update(TableVersion).where(TableVersion.table_name == name)
+                            .values(version=TableVersion.version + 1))
+        if result.rowcount == 0:
+            # строки нет (база создана через create_all, а не миграциями)
+            db.add(TableVersion(table_name=name, version=1))
+            db.flush()
+
+
+def make_etag(tables, versions, variant=None):
+    """Строгий ETag вида s3.c1.r12 (+ вариант представления, например ndjson)"""
+    tag = ".".join(f"{name[0]}{version}" for name, version in zip(tables, versions))
+    return f"{tag}-{variant}" if variant else tag
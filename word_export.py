@@ -0,0 +1,121 @@
+# word_export.py
+"""
+Заявление студента в Word по шаблону templates/blank_zayavlenie.docx.
+
+Шаблон разбирается один раз (DocxTemplate): плейсхолдеры вида {FIO},
+разбитые Word'ом на несколько runs, сводятся в один w:t, после чего XML
+частей с текстом (document, колонтитулы — таблицы входят в document)
+режется на куски по плейсхолдерам. На каждый запрос остаётся склеить
+куски с экранированными значениями и упаковать zip; форматирование
+runs при этом сохраняется.
+"""
+import os
+import re
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+from lxml import etree
+from resources import CachedFile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "blank_zayavlenie.docx")
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_P = f"{{{W_NS}}}p"
+W_T = f"{{{W_NS}}}t"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+PLACEHOLDER_RE = re.compile(r"\{([A-Z_]+)\}")
+TEXT_PART_RE = re.compile(r"^word/(document|header\d*|footer\d*)\.xml$")
+
+
+def _merge_placeholders(p):
+    """Собрать плейсхолдеры абзаца, разбитые на несколько w:t, в первый из них"""
+    nodes = [t for t in p.iter(W_T) if next(t.iterancestors(W_P)) is p]
+    texts = [t.text or "" for t in nodes]
+    full = "".join(texts)
+    if "{" not in full:
+        return
+    starts = []
+    pos = 0
+    for text in texts:
+        starts.append(pos)
+        pos += len(text)
+
+    def node_at(offset):
+        i = len(starts) - 1
+        while starts[i] > offset or (not texts[i] and i > 0):
+            i -= 1
+        return i
+
+    # с конца, чтобы смещения более ранних совпадений не поехали
+    for m in reversed(list(PLACEHOLDER_RE.finditer(full))):
+        start, end = m.span()
+        i, j = node_at(start), node_at(end - 1)
+        if i == j:
+            continue
+        nodes[i].text = texts[i][:start - starts[i]] + m.group(0)
+        nodes[i].set(XML_SPACE, "preserve")
+        for k in range(i + 1, j):
+            nodes[k].text = ""
+        nodes[j].text = texts[j][end - starts[j]:]
+        texts[i], texts[j] = nodes[i].text, nodes[j].text
+
+
+def _compile_part(data):
+    """XML части -> [байты, имя, байты, имя, ..., байты]"""
+    root = etree.fromstring(data)
+    for p in root.iter(W_P):
+        _merge_placeholders(p)
+    for t in root.iter(W_T):
+        if t.text and PLACEHOLDER_RE.search(t.text):
+            t.set(XML_SPACE, "preserve")
+    xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True).decode("utf-8")
+    pieces = PLACEHOLDER_RE.split(xml)
+    return [piece.encode("utf-8") if i % 2 == 0 else piece for i, piece in enumerate(pieces)]
+
+
+class DocxTemplate:
+    """Предразобранный .docx-шаблон с плейсхолдерами {NAME}"""
+
+    def __init__(self, path, compresslevel=1):
+        self.path = path
+        self.compresslevel = compresslevel
+        self.placeholders = set()
+        self._entries = []  # (ZipInfo, bytes) или (ZipInfo, список кусков)
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                data = zf.read(info)
+                if TEXT_PART_RE.match(info.filename):
+                    pieces = _compile_part(data)
+                    if len(pieces) > 1:
+                        self.placeholders.update(pieces[1::2])
+                        data = pieces
+                self._entries.append((info, data))
+
+    def render(self, values):
+        """Подставить значения (имя -> строка) и вернуть содержимое .docx"""
+        encoded = {name: escape(str(value)).encode("utf-8") for name, value in values.items()}
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel) as zf:
+            for info, data in self._entries:
+                if isinstance(data, list):
+                    data = b"".join(
+                        piece if i % 2 == 0 else encoded.get(piece, b"{" + piece.encode() + b"}")
+                        for i, piece in enumerate(data)
+                    )
+                zf.writestr(info.filename, data)
+        return buffer.getvalue()
+
+
+_template = CachedFile(TEMPLATE_PATH, DocxTemplate)
+
+
+def render_application(fio, phone=None):
+    """Подставить ФИО и телефон в шаблон, вернуть содержимое .docx"""
+    return _template.get().render({"FIO": fio, "PHONE": phone or ""})
+
+
+def warm():
+    """Разобрать шаблон заранее (при старте воркера пула)"""
+    _template.get()